@@ -6,13 +6,22 @@ Displays live GPS data from CSV files using Plotly Dash
 import dash
 from dash import dcc, html, Input, Output, State
 import dash_leaflet as dl
+from flask import Response, abort, request
 import plotly.graph_objs as go
 import pandas as pd
+import argparse
+import atexit
 import os
-from datetime import datetime
-import glob
+import threading
+import time
+from datetime import datetime, timezone
 import numpy as np
 
+import gps_export
+from geofence import GeofenceEngine, load_geofences
+from track_store import TrackStore, process_memory
+from trip_segmentation import TripSegmenter, to_epoch
+
 # Initialize the Dash app
 app = dash.Dash(__name__)
 
@@ -167,7 +176,49 @@ app.layout = html.Div([
                 style={'color': '#cccccc', 'fontSize': '14px'},
                 inputStyle={"margin-right": "10px", "cursor": "pointer"}
             )
-        ])
+        ], style={'marginBottom': '10px'}),
+        
+        # Show Geofences Toggle
+        html.Div([
+            dcc.Checklist(
+                id='show-geofences',
+                options=[{'label': ' Geofences', 'value': 'geofences'}],
+                value=['geofences'],
+                style={'color': '#cccccc', 'fontSize': '14px'},
+                inputStyle={"margin-right": "10px", "cursor": "pointer"}
+            )
+        ]),
+        
+        # Time window for path, heatmap, speed graph and trip statistics
+        html.Div([
+            html.Div("Time Window", style={'color': '#888', 'fontSize': '11px', 'textTransform': 'uppercase', 'marginBottom': '6px'}),
+            dcc.RadioItems(
+                id='time-window',
+                options=[
+                    {'label': ' All', 'value': 'all'},
+                    {'label': ' Last 5 min', 'value': '5m'},
+                    {'label': ' Last hour', 'value': '1h'},
+                    {'label': ' Last 24 h', 'value': '24h'},
+                    {'label': ' Range', 'value': 'custom'}
+                ],
+                value='all',
+                style={'color': '#cccccc', 'fontSize': '13px'},
+                inputStyle={"margin-right": "6px", "cursor": "pointer"},
+                labelStyle={'display': 'block', 'marginBottom': '4px'}
+            ),
+            dcc.Input(id='window-start', type='text', placeholder='Start (ISO, UTC)', debounce=True,
+                      style={'width': '100%', 'marginTop': '6px', 'fontSize': '12px'}),
+            dcc.Input(id='window-end', type='text', placeholder='End (ISO, UTC)', debounce=True,
+                      style={'width': '100%', 'marginTop': '6px', 'fontSize': '12px'})
+        ], style={'marginTop': '15px', 'paddingTop': '12px', 'borderTop': '1px solid rgba(255, 255, 255, 0.1)'}),
+        
+        # Track export - streamed by the /export/<format> endpoint
+        html.Div([
+            html.Span("Export", style={'color': '#888', 'fontSize': '11px', 'textTransform': 'uppercase', 'marginRight': '10px'}),
+        ] + [
+            html.A(fmt.upper(), href=f'/export/{fmt}', style={'color': '#4facfe', 'fontSize': '12px', 'marginRight': '10px'})
+            for fmt in gps_export.FORMATS
+        ], style={'marginTop': '15px', 'paddingTop': '12px', 'borderTop': '1px solid rgba(255, 255, 255, 0.1)'})
         
     ], style={
         'position': 'fixed',
@@ -234,42 +285,152 @@ app.layout = html.Div([
 })
 
 
-def get_latest_csv():
-    """Find the most recent GPS log CSV file"""
-    csv_files = glob.glob('logs/gps_log_*.csv')
-    if not csv_files:
-        return None
-    latest_file = max(csv_files, key=os.path.getctime)
-    return latest_file
+# Resident memory budget for parsed fixes; older rows are spilled to
+# per-minute summaries under logs/history. Overridable on the command line.
+MAX_MEMORY_MB = 256
+RETAIN_HOURS = None
+
+# Path, heatmap and speed graph are strided down to at most this many fixes,
+# so what a refresh builds does not grow with the window
+MAX_PATH_POINTS = 5000
+MAX_HEATMAP_POINTS = 1000
+
+# Measured Python/JSON cost of one rendered fix (a [lat, lon] list, a CircleMarker).
+# One refresh's worth is taken out of the memory budget before the store gets it.
+PATH_BYTES_PER_POINT = 200
+HEATMAP_BYTES_PER_POINT = 1500
+RENDER_RESERVE_MB = (MAX_PATH_POINTS * PATH_BYTES_PER_POINT +
+                     MAX_HEATMAP_POINTS * HEATMAP_BYTES_PER_POINT) / 2**20
+
+# Depot / restricted zones, loaded if the file exists. Overridable on the command line.
+GEOFENCE_FILE = 'geofences.geojson'
+
+# Upper bound on fences drawn per refresh (occupied fences are drawn first)
+MAX_RENDERED_FENCES = 300
+
+FENCE_COLORS = {
+    'depot': '#22c55e',
+    'restricted': '#ef4444'
+}
+
+# Segmenter state carried across refreshes - the store feeds it every new fix
+segmenter = TripSegmenter()
 
+# Fences are loaded at startup (see __main__)
+geofences = GeofenceEngine()
 
-def load_gps_data():
-    """Load GPS data from the latest CSV file"""
-    csv_file = get_latest_csv()
+
+def on_new_fixes(frame, start):
+    """Store callback: pass newly parsed fixes to the segmenter and geofences"""
+    # First rows of a (new or truncated) log - start over
+    if start == 0:
+        segmenter.reset()
+        geofences.reset()
+    segmenter.extend(frame)
+    
+    for event in geofences.evaluate(frame):
+        when = datetime.fromtimestamp(event['epoch_ms'] / 1000, timezone.utc).strftime('%H:%M:%S')
+        print(f"Geofence: {event['event'].upper()} {event['name']} ({event['kind']}) at {when} UTC")
+
+
+# Parsed log held across refreshes - each tick only reads the appended rows
+store = TrackStore(on_append=on_new_fixes, max_memory_mb=MAX_MEMORY_MB - RENDER_RESERVE_MB,
+                   retain_hours=RETAIN_HOURS)
+
+# Callbacks run on several server threads; the store, segmenter and geofences are shared
+data_lock = threading.Lock()
+
+# The log is polled on a background thread, so geofence events and the
+# segmenter keep up even when no browser is open. Callbacks only read.
+REFRESH_SECONDS = 1.0
+
+# Preset windows, in seconds back from the newest fix
+TIME_WINDOWS = {
+    '5m': 5 * 60,
+    '1h': 60 * 60,
+    '24h': 24 * 60 * 60
+}
+
+
+def load_gps_data(csv_file=None):
+    """Pull new rows of the latest CSV file into the track store; True if there is data"""
+    if csv_file is None:
+        csv_file = gps_export.latest_log()
     
     if not csv_file or not os.path.exists(csv_file):
-        return pd.DataFrame(), None
+        store.reset()
+        return False
     
     try:
-        df = pd.read_csv(csv_file)
-        
-        # Filter out invalid data
-        df = df[df['latitude'] != 0]
-        df = df[df['longitude'] != 0]
-        df = df[df['altitude'] != -999.0]
-        
-        # Store the actual first point
-        first_point = None
-        if len(df) > 0:
-            first_point = {
-                'latitude': df.iloc[0]['latitude'],
-                'longitude': df.iloc[0]['longitude']
-            }
-        
-        return df, first_point
+        store.refresh(csv_file)
     except Exception as e:
         print(f"Error loading data: {e}")
-        return pd.DataFrame(), None
+    return store.size > 0
+
+
+def refresh_loop():
+    """Background ticker: pull new fixes every REFRESH_SECONDS, viewers or not"""
+    while True:
+        with data_lock:
+            load_gps_data()
+        time.sleep(REFRESH_SECONDS)
+
+
+def flush_history():
+    """Write the newest, still open, history minute (registered to run at exit)"""
+    with data_lock:
+        store.flush_summaries()
+
+
+def start_refresher():
+    """Start the background ticker thread (daemon, exits with the server)"""
+    thread = threading.Thread(target=refresh_loop, name='gps-refresh', daemon=True)
+    thread.start()
+    return thread
+
+
+def parse_window_bound(value):
+    """ISO text from the range inputs -> epoch ms, or None if blank/invalid"""
+    if not value:
+        return None
+    try:
+        return int(to_epoch(value.strip()) * 1000)
+    except ValueError:
+        return None
+
+
+def select_window(window, start_text, end_text):
+    """Row range [i0, i1) of the store for the selected time window"""
+    if window == 'custom':
+        return store.window(parse_window_bound(start_text), parse_window_bound(end_text))
+    if window in TIME_WINDOWS:
+        return store.last(TIME_WINDOWS[window])
+    return 0, store.size
+
+
+def window_truncated(window, start_text):
+    """True if the selected window starts before the oldest resident fix (older ones were spilled)"""
+    if window == 'all' or store.spilled == 0 or store.size == 0:
+        return False
+    epoch = store.column('epoch_ms')
+    if window == 'custom':
+        start_ms = parse_window_bound(start_text)
+    elif window in TIME_WINDOWS:
+        start_ms = epoch[-1] - TIME_WINDOWS[window] * 1000
+    else:
+        return False
+    return start_ms is None or start_ms < epoch[0]
+
+
+def decimate(count, limit):
+    """Indices of at most `limit` evenly strided rows out of `count`, always keeping the last"""
+    if count <= limit:
+        return np.arange(count)
+    step = -(-count // (limit - 1))
+    indices = np.arange(0, count, step)
+    if indices[-1] != count - 1:
+        indices = np.append(indices, count - 1)
+    return indices
 
 
 def calculate_distance(lat1, lon1, lat2, lon2):
@@ -287,6 +448,72 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     return R * c
 
 
+def stopped_mask(i0, i1):
+    """Boolean mask over absolute rows [i0, i1) of fixes that fall inside a detected stop"""
+    mask = np.zeros(i1 - i0, dtype=bool)
+    for start, end in segmenter.stop_ranges():
+        if end >= i0 and start < i1:
+            mask[max(start, i0) - i0:min(end + 1, i1) - i0] = True
+    return mask
+
+
+def window_summary(df, i0):
+    """Trip statistics for a window frame starting at absolute row i0 (cost proportional to the window)"""
+    i1 = i0 + len(df)
+    moving = ~stopped_mask(i0, i1)[1:]
+    steps = calculate_distance(
+        df['latitude'].values[:-1], df['longitude'].values[:-1],
+        df['latitude'].values[1:], df['longitude'].values[1:]
+    )
+    durations = np.diff(df['epoch_ms'].values) / 1000
+    moving_distance = steps[moving].sum()
+    moving_time = durations[moving].sum()
+    return {
+        'distance_m': steps.sum(),
+        'moving_time_s': moving_time,
+        'moving_avg_speed_kmh': moving_distance / moving_time * 3.6 if moving_time > 0 else 0.0,
+        'max_speed_kmh': df['speed_kmh'].max() if len(df) else 0.0,
+        'stops': sum(1 for start, end in segmenter.stop_ranges() if end >= i0 and start < i1)
+    }
+
+
+@app.server.route('/export/<fmt>')
+def export_track(fmt):
+    """Stream the latest log as GPX/KML/GeoJSON without building it in memory
+    
+    Query parameters: start, end (ISO timestamps), simplify (meters)
+    """
+    if fmt not in gps_export.FORMATS:
+        abort(404)
+    
+    csv_file = gps_export.latest_log()
+    if not csv_file:
+        abort(404)
+    
+    try:
+        tolerance = float(request.args.get('simplify', 0))
+        chunks = gps_export.export_chunks(
+            csv_file, fmt,
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            tolerance=tolerance
+        )
+        # Pull the first chunk now so bad parameters fail with a 400
+        first = next(chunks, '')
+    except ValueError:
+        abort(400)
+    
+    def generate():
+        yield first
+        yield from chunks
+    
+    mimetype, extension = gps_export.FORMATS[fmt]
+    filename = os.path.splitext(os.path.basename(csv_file))[0] + extension
+    return Response(generate(), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"'
+    })
+
+
 @app.callback(
     [Output('gps-map', 'center'),
      Output('layer-group', 'children'),
@@ -300,13 +527,50 @@ def calculate_distance(lat1, lon1, lat2, lon2):
      Input('show-path', 'value'),
      Input('show-speed-graph', 'value'),
      Input('show-heatmap', 'value'),
-     Input('show-trip-stats', 'value')]
+     Input('show-trip-stats', 'value'),
+     Input('time-window', 'value'),
+     Input('show-geofences', 'value')],
+    [State('window-start', 'value'),
+     State('window-end', 'value')]
 )
-def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_stats):
+def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_stats,
+                     time_window, show_geofences, window_start, window_end):
     """Update all dashboard components with latest GPS data"""
     
-    # Load data
-    df, first_point = load_gps_data()
+    # Take what this refresh needs while holding the lock (the ticker loads new rows)
+    with data_lock:
+        has_data = store.size > 0
+        if has_data:
+            # Current (latest) position - always live, whatever the window
+            latest = store.frame(store.size - 1).iloc[0]
+            
+            # Only the selected window is materialized
+            i0, i1 = select_window(time_window, window_start, window_end)
+            df = store.frame(i0, i1)
+            
+            # Absolute row numbers, as used by the segmenter
+            i0, i1 = store.base + i0, store.base + i1
+            stopped = stopped_mask(i0, i1)
+            
+            # Whole log: statistics from the cached segment summaries (they include
+            # spilled history); any other window only from the rows it holds
+            whole_log = time_window == 'all' or (
+                store.spilled == 0 and i0 == store.base and i1 == store.base + store.size)
+            trip = segmenter.trip_summary() if whole_log else window_summary(df, i0)
+            truncated = window_truncated(time_window, window_start)
+            spilled = store.spilled
+            buffer_mb = store.nbytes / 2**20
+            
+            # Fences around the window and the live position, occupied ones first
+            active_fences = geofences.active()
+            shown_fences = []
+            if 'geofences' in show_geofences:
+                view_lats = np.append(df['latitude'].to_numpy(), latest['latitude'])
+                view_lons = np.append(df['longitude'].to_numpy(), latest['longitude'])
+                nearby = geofences.fences_in_bounds(view_lats.min(), view_lons.min(), view_lats.max(), view_lons.max())
+                occupied = set(active_fences)
+                shown_fences = (active_fences + [f for f in nearby if f not in occupied])[:MAX_RENDERED_FENCES]
+            recent_events = list(geofences.events)[-3:]
     
     # Default styles for conditional panels
     glass_panel_style = {
@@ -340,7 +604,7 @@ def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_sta
         'display': 'block' if 'stats' in show_trip_stats else 'none'
     }
     
-    if df.empty:
+    if not has_data:
         empty_figure = go.Figure()
         empty_figure.update_layout(
             paper_bgcolor='rgba(0,0,0,0)',
@@ -358,41 +622,34 @@ def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_sta
             html.Div()
         )
     
-    # Get current (latest) position
-    current_lat = df.iloc[-1]['latitude']
-    current_lon = df.iloc[-1]['longitude']
-    current_speed = df.iloc[-1]['speed_kmh']
-    current_alt = df.iloc[-1]['altitude']
-    current_sats = df.iloc[-1]['satellites']
-    current_course = df.iloc[-1]['course']
+    current_lat = latest['latitude']
+    current_lon = latest['longitude']
+    current_speed = latest['speed_kmh']
+    current_alt = latest['altitude']
+    current_sats = latest['satellites']
+    current_course = latest['course']
     
-    # Calculate statistics
     total_points = len(df)
-    avg_speed = df['speed_kmh'].mean()
-    max_speed = df['speed_kmh'].max()
+    rss = process_memory()
+    avg_speed = trip['moving_avg_speed_kmh']
+    max_speed = trip['max_speed_kmh']
+    total_distance = trip['distance_m']
+    moving_minutes = trip['moving_time_s'] / 60
     min_alt = df['altitude'].min()
     max_alt = df['altitude'].max()
     
-    # Calculate total distance
-    total_distance = 0
-    if len(df) > 1:
-        for i in range(1, len(df)):
-            dist = calculate_distance(
-                df.iloc[i-1]['latitude'], df.iloc[i-1]['longitude'],
-                df.iloc[i]['latitude'], df.iloc[i]['longitude']
-            )
-            total_distance += dist
-    
     # Map center and layers
     map_center = [current_lat, current_lon]
     
-    # Create path (polyline) from GPS points
-    path_positions = [[row['latitude'], row['longitude']] for _, row in df.iterrows()]
+    latitudes = df['latitude'].to_numpy()
+    longitudes = df['longitude'].to_numpy()
     
     map_layers = []
     
-    # Add path if enabled
+    # Add path if enabled - strided, so the list built here is bounded
     if 'path' in show_path:
+        keep = decimate(len(df), MAX_PATH_POINTS)
+        path_positions = np.column_stack((latitudes[keep], longitudes[keep])).tolist()
         map_layers.append(
             dl.Polyline(
                 positions=path_positions,
@@ -405,40 +662,52 @@ def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_sta
     # Add heatmap if enabled
     if 'heatmap' in show_heatmap:
         # Create gradient heatmap based on speed - red (slow) to yellow (fast)
-        heatmap_circles = []
-        for idx, row in df.iterrows():
-            # Calculate color based on speed (0-100 km/h range)
-            speed_ratio = min(row['speed_kmh'] / 100, 1.0)
-            
-            # Gradient from purple (slow) -> orange (medium) -> red (fast)
-            if speed_ratio < 0.5:
-                # Purple to orange
-                r = int(138 + (255 - 138) * (speed_ratio * 2))
-                g = int(43 + (165 - 43) * (speed_ratio * 2))
-                b = int(226 - 226 * (speed_ratio * 2))
-            else:
-                # Orange to red
-                r = 255
-                g = int(165 - 165 * ((speed_ratio - 0.5) * 2))
-                b = 0
-            
-            color = f'rgb({r},{g},{b})'
-            
-            heatmap_circles.append(
-                dl.CircleMarker(
-                    center=[row['latitude'], row['longitude']],
-                    radius=12,
-                    color=color,
-                    fillColor=color,
-                    fillOpacity=0.3,
-                    weight=1,
-                    opacity=0.6
-                )
+        # Stationary fixes are left out so parked time does not dominate
+        moving = np.flatnonzero(~stopped)
+        moving = moving[decimate(len(moving), MAX_HEATMAP_POINTS)]
+        
+        # Calculate color based on speed (0-100 km/h range), for all fixes at once
+        speed_ratio = np.minimum(df['speed_kmh'].to_numpy()[moving] / 100, 1.0)
+        low = speed_ratio < 0.5
+        
+        # Gradient from purple (slow) -> orange (medium) -> red (fast)
+        r = np.where(low, 138 + (255 - 138) * (speed_ratio * 2), 255).astype(int)
+        g = np.where(low, 43 + (165 - 43) * (speed_ratio * 2), 165 - 165 * ((speed_ratio - 0.5) * 2)).astype(int)
+        b = np.where(low, 226 - 226 * (speed_ratio * 2), 0).astype(int)
+        
+        heatmap_circles = [
+            dl.CircleMarker(
+                center=[lat, lon],
+                radius=12,
+                color=f'rgb({red},{green},{blue})',
+                fillColor=f'rgb({red},{green},{blue})',
+                fillOpacity=0.3,
+                weight=1,
+                opacity=0.6
             )
+            for lat, lon, red, green, blue in zip(latitudes[moving].tolist(), longitudes[moving].tolist(),
+                                                  r.tolist(), g.tolist(), b.tolist())
+        ]
         map_layers.append(
             dl.LayerGroup(children=heatmap_circles, id='heatmap-layer')
         )
     
+    # Add geofences - occupied fences are filled more strongly
+    for f in shown_fences:
+        fence = geofences.fences[f]
+        color = FENCE_COLORS.get(fence['kind'], '#a855f7')
+        style = dict(
+            color=color,
+            fillColor=color,
+            fillOpacity=0.3 if f in active_fences else 0.08,
+            weight=3 if f in active_fences else 1,
+            children=[dl.Tooltip(f"{fence['name']} ({fence['kind']})")]
+        )
+        if fence['shape'] == 'circle':
+            map_layers.append(dl.Circle(center=fence['center'], radius=fence['radius'], **style))
+        else:
+            map_layers.append(dl.Polygon(positions=fence['positions'], **style))
+    
     # Add current position and markers
     map_layers.extend([
         # Current position - Active marker
@@ -474,21 +743,25 @@ def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_sta
             fillColor='#ffffff',
             fillOpacity=1.0,
             weight=2
-        ),
-        # Start position - Origin marker
-        dl.CircleMarker(
-            center=[first_point['latitude'], first_point['longitude']] if first_point else [df.iloc[0]['latitude'], df.iloc[0]['longitude']],
-            radius=6,
-            color='#64748b',
-            fillColor='#94a3b8',
-            fillOpacity=0.6,
-            weight=2,
-            children=[
-                dl.Tooltip("Start")
-            ]
         )
     ])
     
+    # Start position (of the selected window) - Origin marker
+    if len(df):
+        map_layers.append(
+            dl.CircleMarker(
+                center=[df['latitude'].iloc[0], df['longitude'].iloc[0]],
+                radius=6,
+                color='#64748b',
+                fillColor='#94a3b8',
+                fillOpacity=0.6,
+                weight=2,
+                children=[
+                    dl.Tooltip("Start")
+                ]
+            )
+        )
+    
     # Professional stats display
     stats_content = html.Div([
         # Large speed display
@@ -544,8 +817,10 @@ def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_sta
     
     # Create speed graph
     speed_figure = go.Figure()
+    keep = decimate(len(df), MAX_PATH_POINTS)
     speed_figure.add_trace(go.Scatter(
-        y=df['speed_kmh'],
+        x=pd.to_datetime(df['epoch_ms'].to_numpy()[keep], unit='ms'),
+        y=df['speed_kmh'].to_numpy()[keep],
         mode='lines',
         line=dict(color='#4facfe', width=2),
         fill='tozeroy',
@@ -560,7 +835,7 @@ def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_sta
         xaxis=dict(
             showgrid=True,
             gridcolor='rgba(255, 255, 255, 0.1)',
-            title='Data Points',
+            title='Time (UTC)',
             title_font=dict(size=10, color='#888')
         ),
         yaxis=dict(
@@ -580,7 +855,8 @@ def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_sta
     
     # Create trip statistics content
     trip_stats_content = html.Div([
-        html.Div("Trip Statistics", style={
+        html.Div("Trip Statistics" + (" (truncated)" if truncated else ""),
+                 title="Window reaches past the retained history" if truncated else None, style={
             'color': '#4facfe',
             'fontSize': '14px',
             'fontWeight': '600',
@@ -606,6 +882,16 @@ def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_sta
             html.Span(f"{max_speed:.1f} km/h", style={'color': '#4facfe', 'fontSize': '13px', 'fontWeight': '600'})
         ], style={'marginBottom': '8px', 'display': 'flex', 'justifyContent': 'space-between'}),
         
+        html.Div([
+            html.Span("Moving Time", style={'color': '#888', 'fontSize': '11px', 'textTransform': 'uppercase'}),
+            html.Span(f"{moving_minutes:.0f} min", style={'color': '#fff', 'fontSize': '13px', 'fontWeight': '500'})
+        ], style={'marginBottom': '8px', 'display': 'flex', 'justifyContent': 'space-between'}),
+        
+        html.Div([
+            html.Span("Stops", style={'color': '#888', 'fontSize': '11px', 'textTransform': 'uppercase'}),
+            html.Span(f"{trip['stops']}", style={'color': '#fff', 'fontSize': '13px', 'fontWeight': '500'})
+        ], style={'marginBottom': '8px', 'display': 'flex', 'justifyContent': 'space-between'}),
+        
         html.Div(style={'borderTop': '1px solid rgba(255, 255, 255, 0.1)', 'margin': '12px 0'}),
         
         html.Div([
@@ -615,9 +901,27 @@ def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_sta
         
         html.Div([
             html.Span("Data Points", style={'color': '#888', 'fontSize': '10px', 'display': 'block', 'marginBottom': '4px', 'textTransform': 'uppercase'}),
-            html.Span(f"{total_points:,}", style={'color': '#ccc', 'fontSize': '12px'})
+            html.Span(f"{total_points:,}" + (f" (+{spilled:,} spilled)" if spilled else ""), style={'color': '#ccc', 'fontSize': '12px'})
+        ], style={'marginBottom': '8px'}),
+        
+        html.Div([
+            html.Span("Memory", style={'color': '#888', 'fontSize': '10px', 'display': 'block', 'marginBottom': '4px', 'textTransform': 'uppercase'}),
+            html.Span(f"{buffer_mb:.1f} MB buffers" + (f" / {rss / 2**20:.0f} MB resident" if rss else ""), style={'color': '#ccc', 'fontSize': '12px'})
         ])
-    ])
+    ] + ([
+        html.Div(style={'borderTop': '1px solid rgba(255, 255, 255, 0.1)', 'margin': '12px 0'}),
+        
+        html.Div([
+            html.Span("Geofence Events", style={'color': '#888', 'fontSize': '10px', 'display': 'block', 'marginBottom': '4px', 'textTransform': 'uppercase'})
+        ] + ([
+            html.Div(
+                f"{datetime.fromtimestamp(event['epoch_ms'] / 1000, timezone.utc).strftime('%H:%M:%S')} "
+                f"{event['event']} {event['name']}",
+                style={'color': '#22c55e' if event['event'] == 'enter' else '#f59e0b', 'fontSize': '12px'}
+            )
+            for event in reversed(recent_events)
+        ] or [html.Span("None yet", style={'color': '#666', 'fontSize': '12px'})]))
+    ] if geofences.fences else []))
     
     return (
         map_center,
@@ -632,6 +936,30 @@ def update_dashboard(n, show_path, show_speed_graph, show_heatmap, show_trip_sta
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Real-time GPS dashboard")
+    parser.add_argument('--max-memory-mb', type=float, default=MAX_MEMORY_MB,
+                        help=f"Memory budget for parsed fixes (default: {MAX_MEMORY_MB})")
+    parser.add_argument('--retain-hours', type=float, default=RETAIN_HOURS,
+                        help="Keep only this much recent history in memory (default: no age limit)")
+    parser.add_argument('--geofences', metavar='GEOJSON',
+                        help=f"Geofence definitions (default: {GEOFENCE_FILE} if present)")
+    args = parser.parse_args()
+    try:
+        # Part of the budget is kept for building each refresh's map layers
+        store.set_retention(args.max_memory_mb - RENDER_RESERVE_MB, args.retain_hours)
+    except ValueError as e:
+        parser.error(f"{e} after the {RENDER_RESERVE_MB:.1f} MB render reserve")
+    
+    # Only the default file is optional - an explicit path must exist
+    if args.geofences is not None and not os.path.exists(args.geofences):
+        parser.error(f"Geofence file not found: {args.geofences}")
+    geofence_file = args.geofences or GEOFENCE_FILE
+    if os.path.exists(geofence_file):
+        geofences = load_geofences(geofence_file)
+    
+    atexit.register(flush_history)
+    start_refresher()
+    
     print("\n" + "="*60)
     print("Starting Real-Time GPS Dashboard with Interactive Overlays")
     print("="*60)
@@ -642,6 +970,10 @@ if __name__ == '__main__':
     print("  • Speed graph overlay")
     print("  • Location heatmap")
     print("  • Trip statistics panel")
+    print(f"  • Geofences: {len(geofences.fences)} loaded")
+    print(f"\nMemory budget: {store.budget_mb:.1f} MB ({store.max_rows:,} fixes) "
+          f"+ {RENDER_RESERVE_MB:.1f} MB render reserve" +
+          (f", retaining {args.retain_hours:g} h" if args.retain_hours else ""))
     print("\nPress Ctrl+C to stop")
     print("="*60 + "\n")
     
@@ -0,0 +1,286 @@
+"""
+Dashboard Load Test
+Simulates many concurrent viewers hitting the update_dashboard callback
+Reports latency percentiles, throughput, response size and server CPU
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Outputs and inputs of update_dashboard, in callback order
+OUTPUTS = [
+    ('gps-map', 'center'),
+    ('layer-group', 'children'),
+    ('stats-panel', 'children'),
+    ('last-update', 'children'),
+    ('speed-graph-container', 'style'),
+    ('speed-graph', 'figure'),
+    ('trip-stats-panel', 'style'),
+    ('trip-stats-panel', 'children')
+]
+
+# Overlay toggle combinations with rough viewer weights
+# (show_path, show_speed_graph, show_heatmap, show_trip_stats, show_geofences)
+TOGGLE_MIX = [
+    ((['path'], [], [], ['stats'], ['geofences']), 45),           # dashboard defaults
+    ((['path'], ['speed'], [], ['stats'], ['geofences']), 20),
+    (([], [], [], ['stats'], []), 10),
+    ((['path'], [], [], ['stats'], []), 5),
+    ((['path'], [], ['heatmap'], ['stats'], ['geofences']), 10),
+    ((['path'], ['speed'], ['heatmap'], ['stats'], ['geofences']), 10)
+]
+
+# Time window selections with rough viewer weights
+WINDOW_MIX = [
+    ('all', 60),
+    ('5m', 20),
+    ('1h', 20)
+]
+
+# Chance a viewer flips to a different toggle combination between refreshes
+TOGGLE_CHANGE_PROBABILITY = 0.05
+
+
+def build_payload(n_intervals, toggles, window, changed):
+    """Request body Dash sends for one update_dashboard call"""
+    show_path, show_speed_graph, show_heatmap, show_trip_stats, show_geofences = toggles
+    return {
+        'output': '..' + '...'.join(f'{id_}.{prop}' for id_, prop in OUTPUTS) + '..',
+        'outputs': [{'id': id_, 'property': prop} for id_, prop in OUTPUTS],
+        'inputs': [
+            {'id': 'interval-component', 'property': 'n_intervals', 'value': n_intervals},
+            {'id': 'show-path', 'property': 'value', 'value': show_path},
+            {'id': 'show-speed-graph', 'property': 'value', 'value': show_speed_graph},
+            {'id': 'show-heatmap', 'property': 'value', 'value': show_heatmap},
+            {'id': 'show-trip-stats', 'property': 'value', 'value': show_trip_stats},
+            {'id': 'time-window', 'property': 'value', 'value': window},
+            {'id': 'show-geofences', 'property': 'value', 'value': show_geofences}
+        ],
+        'changedPropIds': [changed],
+        'state': [
+            {'id': 'window-start', 'property': 'value', 'value': None},
+            {'id': 'window-end', 'property': 'value', 'value': None}
+        ]
+    }
+
+
+def pick_toggles():
+    combos, weights = zip(*TOGGLE_MIX)
+    return random.choices(combos, weights=weights)[0]
+
+
+def pick_window():
+    windows, weights = zip(*WINDOW_MIX)
+    return random.choices(windows, weights=weights)[0]
+
+
+class Results:
+    """Thread-safe collector of per-request measurements"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.bytes = []
+        self.errors = 0
+
+    def record(self, latency, size):
+        with self.lock:
+            self.latencies.append(latency)
+            self.bytes.append(size)
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+
+def viewer(url, interval, stop_at, results):
+    """One simulated browser tab: refresh every `interval` seconds, sometimes toggling overlays or the window"""
+    toggles = pick_toggles()
+    window = pick_window()
+    n_intervals = 0
+    # Spread the first requests so viewers do not fire in lockstep
+    time.sleep(random.uniform(0, interval))
+
+    while time.time() < stop_at:
+        changed = 'interval-component.n_intervals'
+        if random.random() < TOGGLE_CHANGE_PROBABILITY:
+            toggles = pick_toggles()
+            window = pick_window()
+            changed = 'show-path.value'
+        else:
+            n_intervals += 1
+
+        body = json.dumps(build_payload(n_intervals, toggles, window, changed)).encode()
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'})
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                size = len(response.read())
+            results.record(time.perf_counter() - started, size)
+        except (urllib.error.URLError, OSError):
+            results.record_error()
+
+        # Like dcc.Interval, the next tick is due `interval` after the last one
+        elapsed = time.perf_counter() - started
+        time.sleep(max(0.0, interval - elapsed))
+
+
+def cpu_seconds(pid):
+    """User + system CPU seconds used by a process (Linux /proc), or None"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def wait_for_server(base_url, timeout=60):
+    """Block until the dashboard answers, or raise after `timeout` seconds"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url, timeout=2):
+                return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    raise RuntimeError(f"Dashboard did not come up at {base_url}")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(results, duration, cpu_used, clients):
+    latencies = sorted(results.latencies)
+    report = {
+        'clients': clients,
+        'duration_s': duration,
+        'requests': len(latencies),
+        'errors': results.errors,
+        'throughput_rps': len(latencies) / duration if duration > 0 else 0.0,
+        'latency_p50_ms': None,
+        'latency_p95_ms': None,
+        'latency_p99_ms': None,
+        'latency_max_ms': None,
+        'response_bytes_mean': None,
+        'response_bytes_max': None,
+        'server_cpu_percent': cpu_used / duration * 100 if cpu_used is not None and duration > 0 else None
+    }
+    if latencies:
+        report.update({
+            'latency_p50_ms': percentile(latencies, 50) * 1000,
+            'latency_p95_ms': percentile(latencies, 95) * 1000,
+            'latency_p99_ms': percentile(latencies, 99) * 1000,
+            'latency_max_ms': latencies[-1] * 1000,
+            'response_bytes_mean': statistics.mean(results.bytes),
+            'response_bytes_max': max(results.bytes)
+        })
+    return report
+
+
+def print_report(report, interval):
+    def ms(value):
+        return f"{value:8.1f} ms" if value is not None else "     n/a"
+
+    print("\n" + "="*60)
+    print(f"Load Test Results - {report['clients']} viewers, {report['duration_s']:.0f}s")
+    print("="*60)
+    print(f"Requests:        {report['requests']:,} ({report['errors']} errors)")
+    print(f"Throughput:      {report['throughput_rps']:.1f} req/s")
+    print(f"Latency p50:     {ms(report['latency_p50_ms'])}")
+    print(f"Latency p95:     {ms(report['latency_p95_ms'])}")
+    print(f"Latency p99:     {ms(report['latency_p99_ms'])}")
+    print(f"Latency max:     {ms(report['latency_max_ms'])}")
+    if report['response_bytes_mean'] is not None:
+        print(f"Response size:   {report['response_bytes_mean']/1024:.1f} KB mean, "
+              f"{report['response_bytes_max']/1024:.1f} KB max")
+    if report['server_cpu_percent'] is not None:
+        print(f"Server CPU:      {report['server_cpu_percent']:.0f}% of one core")
+    else:
+        print("Server CPU:      n/a (pass --server-pid or --start-server on Linux)")
+
+    if report['latency_p95_ms'] is not None and report['latency_p95_ms'] > interval * 1000:
+        print(f"\nWARNING: p95 latency exceeds the {interval:.1f}s refresh - the dashboard is falling behind")
+    print("="*60)
+
+
+def main():
+    """Run the load test"""
+    parser = argparse.ArgumentParser(description="Load test the dashboard update callback")
+    parser.add_argument('-c', '--clients', type=int, default=10, help="Concurrent simulated viewers")
+    parser.add_argument('-d', '--duration', type=float, default=30.0, help="Test length in seconds")
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help="Refresh interval per viewer in seconds (0 = back-to-back)")
+    parser.add_argument('--url', default='http://127.0.0.1:8050', help="Dashboard base URL")
+    parser.add_argument('--start-server', action='store_true', help="Launch dashboard.py for the test")
+    parser.add_argument('--server-pid', type=int, help="PID of an already running dashboard (for CPU)")
+    parser.add_argument('--sim-rate', type=float, default=0.0,
+                        help="Run the GPS simulator at this many points/s during the test (0 = off)")
+    parser.add_argument('--json', metavar='PATH', help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    children = []
+    try:
+        server_pid = args.server_pid
+        if args.start_server:
+            server = subprocess.Popen([sys.executable, os.path.join(here, 'dashboard.py')],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            children.append(server)
+            server_pid = server.pid
+
+        if args.sim_rate > 0:
+            os.makedirs('logs', exist_ok=True)
+            children.append(subprocess.Popen(
+                [sys.executable, os.path.join(here, 'gps_stream_simulator.py'),
+                 '--rate', str(args.sim_rate), '--quiet'],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+
+        base_url = args.url.rstrip('/')
+        wait_for_server(base_url + '/')
+        print(f"Running {args.clients} viewers against {base_url} for {args.duration:.0f}s...")
+
+        results = Results()
+        cpu_before = cpu_seconds(server_pid) if server_pid else None
+        started = time.time()
+        stop_at = started + args.duration
+        threads = [
+            threading.Thread(target=viewer, args=(base_url + '/_dash-update-component',
+                                                  args.interval, stop_at, results), daemon=True)
+            for _ in range(args.clients)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.time() - started
+
+        cpu_after = cpu_seconds(server_pid) if server_pid else None
+        cpu_used = cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None
+
+        report = summarize(results, duration, cpu_used, args.clients)
+        print_report(report, args.interval)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+    finally:
+        for child in children:
+            child.terminate()
+            child.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Geofence Engine
+Evaluates batches of GPS fixes against polygon and circle zones
+A uniform grid over fence bounding boxes keeps per-fix cost sublinear
+"""
+
+import json
+import math
+from collections import deque
+
+import numpy as np
+
+EARTH_RADIUS = 6371000  # Earth's radius in meters
+
+# Grid cell size of the spatial index, in degrees (~1 km)
+GRID_CELL_DEG = 0.01
+
+# Fences whose bounding box spans more grid cells than this are not indexed;
+# they are kept in a short list that every batch checks (bounding box first)
+MAX_CELLS_PER_FENCE = 400
+
+# Points tested against one polygon at a time (bounds the points x edges matrix)
+PIP_BLOCK = 4096
+
+# Enter/exit events kept in memory for display
+MAX_EVENTS = 100
+
+
+def points_in_polygon(lats, lons, edges):
+    """Vectorized even-odd ray casting; `edges` is (lat1, lon1, lat2, lon2) arrays
+
+    Using the edges of every ring together handles holes and multi-part
+    polygons with the same rule.
+    """
+    lat1, lon1, lat2, lon2 = edges
+    inside = np.zeros(len(lats), dtype=bool)
+    for start in range(0, len(lats), PIP_BLOCK):
+        lat = lats[start:start + PIP_BLOCK, None]
+        lon = lons[start:start + PIP_BLOCK, None]
+        straddles = (lat1 > lat) != (lat2 > lat)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing_lon = lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        crossings = np.count_nonzero(straddles & (lon < crossing_lon), axis=1)
+        inside[start:start + PIP_BLOCK] = crossings % 2 == 1
+    return inside
+
+
+def points_in_circle(lats, lons, center_lat, center_lon, radius):
+    """Vectorized Haversine distance test against one circle"""
+    lat1 = math.radians(center_lat)
+    lat2 = np.radians(lats)
+    a = (np.sin((lat2 - lat1) / 2)**2 +
+         math.cos(lat1) * np.cos(lat2) * np.sin(np.radians(lons - center_lon) / 2)**2)
+    return EARTH_RADIUS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a)) <= radius
+
+
+def _ring_edges(rings):
+    """Closed (lat, lon) rings -> concatenated edge arrays"""
+    lat1, lon1, lat2, lon2 = [], [], [], []
+    for ring in rings:
+        ring = np.asarray(ring, dtype=np.float64)
+        lat1.append(ring[:-1, 0])
+        lon1.append(ring[:-1, 1])
+        lat2.append(ring[1:, 0])
+        lon2.append(ring[1:, 1])
+    return tuple(np.concatenate(values) for values in (lat1, lon1, lat2, lon2))
+
+
+def _close(ring):
+    """GeoJSON [lon, lat] ring -> closed list of [lat, lon]"""
+    points = [[lat, lon] for lon, lat in ring]
+    if points and points[0] != points[-1]:
+        points.append(points[0])
+    return points
+
+
+def _parse_feature(feature, index):
+    """GeoJSON feature -> fence dict, or None if the geometry is not supported"""
+    geometry = feature.get('geometry') or {}
+    properties = feature.get('properties') or {}
+    fence = {
+        'id': str(feature.get('id', properties.get('id', index))),
+        'name': properties.get('name', f'Fence {index}'),
+        'kind': properties.get('kind', 'zone')
+    }
+
+    if geometry.get('type') == 'Point' and 'radius' in properties:
+        lon, lat = geometry['coordinates'][:2]
+        radius = float(properties['radius'])
+        # Bounding box on the same sphere as the Haversine test, so it never clips the circle
+        angle = radius / EARTH_RADIUS
+        dlat = math.degrees(angle)
+        sin_dlon = math.sin(angle) / max(math.cos(math.radians(lat)), 1e-12)
+        dlon = math.degrees(math.asin(sin_dlon)) if sin_dlon < 1 else 180.0
+        fence.update({
+            'shape': 'circle',
+            'center': [lat, lon],
+            'radius': radius,
+            'bounds': (lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+        })
+        return fence
+
+    if geometry.get('type') == 'Polygon':
+        parts = [geometry['coordinates']]
+    elif geometry.get('type') == 'MultiPolygon':
+        parts = geometry['coordinates']
+    else:
+        return None
+
+    # Leaflet wants [lat, lon] rings: outer ring first, then holes
+    positions = [[_close(ring) for ring in part] for part in parts]
+    rings = [ring for part in positions for ring in part]
+    lats = [point[0] for ring in rings for point in ring]
+    lons = [point[1] for ring in rings for point in ring]
+    fence.update({
+        'shape': 'polygon',
+        'positions': positions[0] if len(positions) == 1 else positions,
+        'edges': _ring_edges(rings),
+        'bounds': (min(lats), min(lons), max(lats), max(lons))
+    })
+    return fence
+
+
+class GeofenceEngine:
+    """Spatially indexed fences plus the in/out state of the tracked unit"""
+
+    def __init__(self, fences=(), cell_deg=GRID_CELL_DEG):
+        self.fences = list(fences)
+        self.cell_deg = cell_deg
+        self.events = deque(maxlen=MAX_EVENTS)
+        self._build_index()
+        self.reset()
+
+    def reset(self):
+        """Forget which fences the unit is in (e.g. a new log started)"""
+        self.occupied = set()
+        self.events.clear()
+
+    def _build_index(self):
+        """Grid cell -> array of fences whose bounding box touches it, plus the large fences"""
+        cells = {}
+        self.large = []
+        for i, fence in enumerate(self.fences):
+            min_lat, min_lon, max_lat, max_lon = fence['bounds']
+            n_cells = ((self._cell(max_lon) - self._cell(min_lon) + 1) *
+                       (self._cell(max_lat) - self._cell(min_lat) + 1))
+            if n_cells > MAX_CELLS_PER_FENCE:
+                self.large.append(i)
+                continue
+            for ix in range(self._cell(min_lon), self._cell(max_lon) + 1):
+                for iy in range(self._cell(min_lat), self._cell(max_lat) + 1):
+                    cells.setdefault((ix, iy), []).append(i)
+        self.cells = {key: np.array(indices) for key, indices in cells.items()}
+        self.bounds = np.array([fence['bounds'] for fence in self.fences], dtype=np.float64).reshape(-1, 4)
+
+    def _cell(self, degrees):
+        return int(math.floor(degrees / self.cell_deg))
+
+    def _candidates(self, lats, lons):
+        """Fence index -> indices of the points that share a grid cell with it"""
+        keys = np.stack([np.floor(lons / self.cell_deg), np.floor(lats / self.cell_deg)], axis=1).astype(np.int64)
+        unique_keys, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+
+        # Point indices grouped by cell, in one sort
+        groups = np.split(np.argsort(inverse.ravel(), kind='stable'), np.cumsum(counts)[:-1])
+
+        candidates = {}
+        for (ix, iy), points in zip(unique_keys.tolist(), groups):
+            fences = self.cells.get((ix, iy))
+            if fences is None:
+                continue
+            for f in fences.tolist():
+                candidates.setdefault(f, []).append(points)
+        candidates = {f: np.concatenate(parts) for f, parts in candidates.items()}
+
+        # Large fences are not in the grid - every point is a candidate
+        if self.large:
+            every_point = np.arange(len(lats))
+            for f in self.large:
+                candidates[f] = every_point
+        return candidates
+
+    def contains(self, fence, lats, lons):
+        """Which of the points lie inside one fence"""
+        min_lat, min_lon, max_lat, max_lon = fence['bounds']
+        result = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+        if result.any():
+            hits = np.flatnonzero(result)
+            if fence['shape'] == 'circle':
+                result[hits] = points_in_circle(lats[hits], lons[hits], *fence['center'], fence['radius'])
+            else:
+                result[hits] = points_in_polygon(lats[hits], lons[hits], fence['edges'])
+        return result
+
+    def evaluate(self, frame):
+        """Test a batch of fixes (time order) and return the enter/exit events it causes"""
+        if not self.fences or len(frame) == 0:
+            return []
+        lats = frame['latitude'].to_numpy(dtype=np.float64)
+        lons = frame['longitude'].to_numpy(dtype=np.float64)
+        epochs = frame['epoch_ms'].to_numpy()
+
+        candidates = self._candidates(lats, lons)
+        # Fences the unit is in must be checked too, or exits would be missed
+        touched = set(candidates) | self.occupied
+
+        events = []
+        for f in touched:
+            fence = self.fences[f]
+            membership = np.zeros(len(lats), dtype=bool)
+            points = candidates.get(f)
+            if points is not None:
+                membership[points] = self.contains(fence, lats[points], lons[points])
+
+            # Transitions, including the one from the state before this batch
+            previous = np.concatenate(([f in self.occupied], membership[:-1]))
+            for i in np.flatnonzero(membership != previous).tolist():
+                events.append({
+                    'fence': fence['id'],
+                    'name': fence['name'],
+                    'kind': fence['kind'],
+                    'event': 'enter' if membership[i] else 'exit',
+                    'epoch_ms': int(epochs[i]),
+                    'latitude': float(lats[i]),
+                    'longitude': float(lons[i])
+                })
+            if membership[-1]:
+                self.occupied.add(f)
+            else:
+                self.occupied.discard(f)
+
+        events.sort(key=lambda event: event['epoch_ms'])
+        self.events.extend(events)
+        return events
+
+    def fences_in_bounds(self, min_lat, min_lon, max_lat, max_lon):
+        """Indices of fences whose bounding box overlaps the given box"""
+        if not self.fences:
+            return []
+        b = self.bounds
+        overlap = (b[:, 0] <= max_lat) & (b[:, 2] >= min_lat) & (b[:, 1] <= max_lon) & (b[:, 3] >= min_lon)
+        return np.flatnonzero(overlap).tolist()
+
+    def active(self):
+        """Indices of the fences the unit is currently inside"""
+        return sorted(self.occupied)
+
+
+def load_geofences(path):
+    """Build an engine from a GeoJSON FeatureCollection of fences
+
+    Polygon/MultiPolygon features are polygon fences, Point features with a
+    `radius` property (meters) are circles. Optional properties: `name`,
+    and `kind` (e.g. 'depot' or 'restricted').
+    """
+    with open(path) as f:
+        data = json.load(f)
+    features = data['features'] if data.get('type') == 'FeatureCollection' else [data]
+    fences = [fence for fence in (_parse_feature(feature, i) for i, feature in enumerate(features)) if fence]
+    return GeofenceEngine(fences)
@@ -0,0 +1,198 @@
+"""
+GPS Track Export
+Streams a GPS log CSV out as GPX, KML or GeoJSON in constant memory
+Usable from the command line or from the dashboard download endpoint
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from trip_segmentation import haversine, to_epoch
+
+FORMATS = {
+    'gpx': ('application/gpx+xml', '.gpx'),
+    'kml': ('application/vnd.google-earth.kml+xml', '.kml'),
+    'geojson': ('application/geo+json', '.geojson')
+}
+
+# Size of the pieces handed to the file / HTTP response
+CHUNK_SIZE = 64 * 1024
+
+
+def latest_log():
+    """Find the most recent GPS log CSV file"""
+    csv_files = glob.glob('logs/gps_log_*.csv')
+    if not csv_files:
+        return None
+    return max(csv_files, key=os.path.getctime)
+
+
+def read_fixes(csv_file, start=None, end=None):
+    """Yield valid fixes from a log one row at a time, optionally time-limited"""
+    start_epoch = to_epoch(start) if start is not None else None
+    end_epoch = to_epoch(end) if end is not None else None
+
+    with open(csv_file, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                fix = {
+                    'timestamp': row['timestamp'],
+                    'epoch': to_epoch(row['timestamp']),
+                    'latitude': float(row['latitude']),
+                    'longitude': float(row['longitude']),
+                    'altitude': float(row['altitude']),
+                    'speed_kmh': float(row['speed_kmh']),
+                    'course': float(row['course']),
+                    'satellites': int(row['satellites']),
+                    'hdop': float(row['hdop'])
+                }
+            except (KeyError, TypeError, ValueError):
+                # Partially written last line of a live log, or a corrupt row
+                continue
+
+            # Same validity rules as the dashboard
+            if fix['latitude'] == 0 or fix['longitude'] == 0 or fix['altitude'] == -999.0:
+                continue
+            if start_epoch is not None and fix['epoch'] < start_epoch:
+                continue
+            if end_epoch is not None and fix['epoch'] > end_epoch:
+                # Not `break` - the clock can step backwards, as the track store allows
+                continue
+            yield fix
+
+
+def simplify(fixes, tolerance):
+    """Drop fixes closer than `tolerance` meters to the last kept one
+
+    Streaming radial-distance simplification: only the last kept and the
+    last skipped fix are held, and the final fix is always emitted.
+    """
+    last_kept = None
+    skipped = None
+    for fix in fixes:
+        if last_kept is None or haversine(last_kept['latitude'], last_kept['longitude'],
+                                          fix['latitude'], fix['longitude']) >= tolerance:
+            last_kept = fix
+            skipped = None
+            yield fix
+        else:
+            skipped = fix
+    if skipped is not None:
+        yield skipped
+
+
+def _iso_utc(epoch):
+    return datetime.fromtimestamp(epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+def gpx_chunks(fixes, name):
+    """Yield a GPX 1.1 document piece by piece"""
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<gpx version="1.1" creator="GPS-Data-Logger-Project" xmlns="http://www.topografix.com/GPX/1/1">\n'
+           f'<trk><name>{escape(name)}</name><trkseg>\n')
+    for fix in fixes:
+        yield (f'<trkpt lat="{fix["latitude"]:.7f}" lon="{fix["longitude"]:.7f}">'
+               f'<ele>{fix["altitude"]:.1f}</ele>'
+               f'<time>{_iso_utc(fix["epoch"])}</time>'
+               f'<sat>{fix["satellites"]}</sat>'
+               f'<hdop>{fix["hdop"]:.2f}</hdop></trkpt>\n')
+    yield '</trkseg></trk>\n</gpx>\n'
+
+
+def kml_chunks(fixes, name):
+    """Yield a KML document with the track as a single LineString"""
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<kml xmlns="http://www.opengis.net/kml/2.2">\n'
+           f'<Document><name>{escape(name)}</name>\n'
+           f'<Placemark><name>{escape(name)}</name>'
+           '<LineString><altitudeMode>absolute</altitudeMode><coordinates>\n')
+    for fix in fixes:
+        yield f'{fix["longitude"]:.7f},{fix["latitude"]:.7f},{fix["altitude"]:.1f}\n'
+    yield '</coordinates></LineString></Placemark>\n</Document>\n</kml>\n'
+
+
+def geojson_chunks(fixes, name):
+    """Yield a GeoJSON FeatureCollection holding one LineString feature"""
+    yield ('{"type": "FeatureCollection", "features": [{"type": "Feature", '
+           f'"properties": {{"name": {json.dumps(name)}}}, '
+           '"geometry": {"type": "LineString", "coordinates": [\n')
+    separator = ''
+    for fix in fixes:
+        yield f'{separator}[{fix["longitude"]:.7f}, {fix["latitude"]:.7f}, {fix["altitude"]:.1f}]'
+        separator = ',\n'
+    yield '\n]}}]}\n'
+
+
+WRITERS = {
+    'gpx': gpx_chunks,
+    'kml': kml_chunks,
+    'geojson': geojson_chunks
+}
+
+
+def export_chunks(csv_file, fmt, start=None, end=None, tolerance=0.0):
+    """Full pipeline: read -> filter -> simplify -> format, batched into CHUNK_SIZE pieces"""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    fixes = read_fixes(csv_file, start, end)
+    if tolerance > 0:
+        fixes = simplify(fixes, tolerance)
+
+    name = os.path.splitext(os.path.basename(csv_file))[0]
+    buffer = []
+    size = 0
+    for piece in WRITERS[fmt](fixes, name):
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Export a GPS log to GPX, KML or GeoJSON")
+    parser.add_argument('csv_file', nargs='?', help="Log to export (default: latest in logs/)")
+    parser.add_argument('-f', '--format', choices=sorted(WRITERS), default='gpx')
+    parser.add_argument('-o', '--output', help="Output file (default: log name + extension, '-' for stdout)")
+    parser.add_argument('--start', help="Only fixes at or after this ISO timestamp")
+    parser.add_argument('--end', help="Only fixes at or before this ISO timestamp")
+    parser.add_argument('--simplify', type=float, default=0.0, metavar='METERS',
+                        help="Drop fixes closer than this to the previous kept fix")
+    args = parser.parse_args()
+
+    # Bad bounds must fail before the output file is created
+    for option, value in (('--start', args.start), ('--end', args.end)):
+        if value is not None:
+            try:
+                to_epoch(value)
+            except ValueError:
+                parser.error(f"{option} is not an ISO timestamp: {value}")
+
+    csv_file = args.csv_file or latest_log()
+    if not csv_file or not os.path.exists(csv_file):
+        parser.error("No GPS log found")
+
+    output = args.output or os.path.splitext(csv_file)[0] + FORMATS[args.format][1]
+    chunks = export_chunks(csv_file, args.format, args.start, args.end, args.simplify)
+
+    if output == '-':
+        sys.stdout.writelines(chunks)
+    else:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.writelines(chunks)
+        print(f"Exported {csv_file} -> {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,10 @@ Generates real-time GPS data for testing the dashboard
 Simulates movement around Madison, WI
 """
 
+import argparse
 import time
 import csv
-from datetime import datetime
+from datetime import datetime, timezone
 import math
 import random
 
@@ -24,15 +25,20 @@ current_alt = START_ALT
 current_course = random.uniform(0, 360)  
 current_speed = 40.0
 
-def generate_gps_point(point_num):
-    """Generate a GPS point that simulates random realistic movement"""
+def generate_gps_point(point_num, interval=1.0, quiet=False):
+    """Generate a GPS point that simulates random realistic movement
+
+    `interval` is the time in seconds since the previous point, so the
+    distance moved matches the reported speed at any --rate.
+    """
     global current_lat, current_lon, current_alt, current_course, current_speed
     
     # Periodic major direction changes (every 15-30 seconds)
     if point_num > 0 and point_num % random.randint(15, 30) == 0:
         # Major course change - turn to a new random direction
         current_course = random.uniform(0, 360)
-        print(f"  >> Major direction change: {current_course:.0f}°")
+        if not quiet:
+            print(f"  >> Major direction change: {current_course:.0f}°")
 
     # Random course changes
     # Small adjustments each second, occasional larger turns
@@ -50,10 +56,11 @@ def generate_gps_point(point_num):
     # Calculate movement based on speed and course
     # Speed in km/h, convert to degrees per second
     distance_per_second = current_speed / 3600 / 111  # km to degrees latitude
+    step = distance_per_second * interval
     
     # Move in current direction
-    lat_change = distance_per_second * math.cos(math.radians(current_course))
-    lon_change = distance_per_second * math.sin(math.radians(current_course)) / math.cos(math.radians(current_lat))
+    lat_change = step * math.cos(math.radians(current_course))
+    lon_change = step * math.sin(math.radians(current_course)) / math.cos(math.radians(current_lat))
     
     current_lat += lat_change
     current_lon += lon_change
@@ -77,7 +84,8 @@ def generate_gps_point(point_num):
     speed_knots = current_speed / 1.852
     
     return {
-        'timestamp': datetime.now().isoformat(),
+        # Naive UTC, matching the C++ logger's timestamp format
+        'timestamp': datetime.now(timezone.utc).replace(tzinfo=None).isoformat(timespec='microseconds'),
         'latitude': current_lat,
         'longitude': current_lon,
         'altitude': current_alt,
@@ -91,6 +99,14 @@ def generate_gps_point(point_num):
 
 def main():
     """Main function to stream GPS data"""
+    parser = argparse.ArgumentParser(description="Stream simulated GPS fixes to a CSV log")
+    parser.add_argument('--rate', type=float, default=1.0,
+                        help="Points written per second (default: 1)")
+    parser.add_argument('--quiet', action='store_true', help="Do not print every point")
+    args = parser.parse_args()
+    if not args.rate > 0:
+        parser.error("--rate must be positive")
+    
     print("\n" + "="*60)
     print("GPS Data Stream Simulator")
     print("="*60)
@@ -118,7 +134,7 @@ def main():
     try:
         while True:
             # Generate GPS point
-            point = generate_gps_point(point_num)
+            point = generate_gps_point(point_num, 1 / args.rate, args.quiet)
             
             # Append to CSV
             with open(filename, 'a', newline='') as f:
@@ -126,18 +142,19 @@ def main():
                 writer.writerow(point)
             
             # Print status
-            print(f"Point {point_num + 1}: "
-                  f"Lat: {point['latitude']:.6f} | "
-                  f"Lon: {point['longitude']:.6f} | "
-                  f"Speed: {point['speed_kmh']:.1f} km/h | "
-                  f"Course: {point['course']:.0f}° | "
-                  f"Alt: {point['altitude']:.1f}m | "
-                  f"Sats: {point['satellites']}")
+            if not args.quiet:
+                print(f"Point {point_num + 1}: "
+                      f"Lat: {point['latitude']:.6f} | "
+                      f"Lon: {point['longitude']:.6f} | "
+                      f"Speed: {point['speed_kmh']:.1f} km/h | "
+                      f"Course: {point['course']:.0f}° | "
+                      f"Alt: {point['altitude']:.1f}m | "
+                      f"Sats: {point['satellites']}")
             
             point_num += 1
             
-            # Wait 1 second before next point
-            time.sleep(1)
+            # Wait before next point (1 second at the default rate)
+            time.sleep(1 / args.rate)
             
     except KeyboardInterrupt:
         print("\n" + "="*60)
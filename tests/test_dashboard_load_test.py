@@ -0,0 +1,29 @@
+"""Tests for the load test's pure helpers"""
+
+from dashboard_load_test import OUTPUTS, build_payload, percentile
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 31))
+    # ceil(0.95 * 30) = 29th value; rounding half to even would give the 28th
+    assert percentile(values, 95) == 29
+    assert percentile(values, 50) == 15
+    assert percentile(values, 99) == 30
+    assert percentile(values, 100) == 30
+    assert percentile(values, 0) == 1
+    assert percentile([7], 95) == 7
+
+
+def test_payload_matches_callback_signature():
+    toggles = (['path'], [], ['heatmap'], ['stats'], ['geofences'])
+    payload = build_payload(3, toggles, '1h', 'interval-component.n_intervals')
+
+    assert payload['output'] == '..' + '...'.join(f'{id_}.{prop}' for id_, prop in OUTPUTS) + '..'
+    assert [(o['id'], o['property']) for o in payload['outputs']] == OUTPUTS
+    assert [i['id'] for i in payload['inputs']] == [
+        'interval-component', 'show-path', 'show-speed-graph', 'show-heatmap',
+        'show-trip-stats', 'time-window', 'show-geofences'
+    ]
+    assert [i['value'] for i in payload['inputs']] == [3, ['path'], [], ['heatmap'], ['stats'], '1h', ['geofences']]
+    assert [s['id'] for s in payload['state']] == ['window-start', 'window-end']
+    assert payload['changedPropIds'] == ['interval-component.n_intervals']
@@ -0,0 +1,192 @@
+"""Tests for the indexed geofence engine"""
+
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+import geofence
+from geofence import load_geofences
+from trip_segmentation import haversine
+
+LAT0, LON0 = 43.07, -89.40
+
+
+def square(lat, lon, half):
+    """Closed GeoJSON [lon, lat] ring of a square around a point"""
+    return [[lon - half, lat - half], [lon + half, lat - half], [lon + half, lat + half],
+            [lon - half, lat + half], [lon - half, lat - half]]
+
+
+def circle(lat, lon, radius, name='circle'):
+    return {'type': 'Feature', 'properties': {'name': name, 'kind': 'restricted', 'radius': radius},
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]}}
+
+
+def polygon(rings, name='polygon'):
+    return {'type': 'Feature', 'properties': {'name': name, 'kind': 'depot'},
+            'geometry': {'type': 'Polygon', 'coordinates': rings}}
+
+
+def engine(tmp_path, features):
+    path = tmp_path / 'fences.geojson'
+    path.write_text(json.dumps({'type': 'FeatureCollection', 'features': features}))
+    return load_geofences(str(path))
+
+
+def frame(lats, lons, start_ms=0):
+    return pd.DataFrame({
+        'epoch_ms': start_ms + np.arange(len(lats), dtype=np.int64) * 1000,
+        'latitude': np.asarray(lats, dtype=np.float64),
+        'longitude': np.asarray(lons, dtype=np.float64)
+    })
+
+
+def random_fences(seed=1, n=60):
+    """Circles and holed, irregular polygons scattered around LAT0/LON0"""
+    rng = np.random.RandomState(seed)
+    features = []
+    for i in range(n):
+        lat = LAT0 + rng.uniform(-0.03, 0.03)
+        lon = LON0 + rng.uniform(-0.03, 0.03)
+        r = rng.uniform(0.001, 0.005)
+        if i % 2:
+            features.append(circle(lat, lon, r * 111000, name=f'c{i}'))
+        else:
+            angles = np.linspace(0, 2 * np.pi, 9, endpoint=False)
+            radii = r * rng.uniform(0.6, 1.0, len(angles))
+            outer = [[lon + a * math.cos(t), lat + a * math.sin(t)] for a, t in zip(radii, angles)]
+            hole = [[lon + r / 4 * math.cos(t), lat + r / 4 * math.sin(t)] for t in angles[::2]]
+            features.append(polygon([outer + outer[:1], hole + hole[:1]], name=f'p{i}'))
+    return features
+
+
+def scalar_inside(feature, lat, lon):
+    """Reference membership, one point at a time, straight from the GeoJSON"""
+    geometry = feature['geometry']
+    if geometry['type'] == 'Point':
+        center_lon, center_lat = geometry['coordinates']
+        return haversine(center_lat, center_lon, lat, lon) <= feature['properties']['radius']
+
+    parts = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+    crossings = 0
+    for rings in parts:
+        for ring in rings:
+            for (lon1, lat1), (lon2, lat2) in zip(ring[:-1], ring[1:]):
+                if (lat1 > lat) != (lat2 > lat) and lon < lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1):
+                    crossings += 1
+    return crossings % 2 == 1
+
+
+def random_walk(seed=2, n=3000):
+    rng = np.random.RandomState(seed)
+    lats = LAT0 - 0.035 + np.cumsum(rng.normal(0, 0.0005, n)) + np.linspace(0, 0.07, n)
+    lons = LON0 - 0.035 + np.cumsum(rng.normal(0, 0.0005, n)) + np.linspace(0, 0.07, n)
+    return lats, lons
+
+
+def test_vectorized_tests_match_scalar_reference(tmp_path):
+    features = random_fences()
+    fences = engine(tmp_path, features)
+    rng = np.random.RandomState(3)
+    lats = LAT0 + rng.uniform(-0.035, 0.035, 2000)
+    lons = LON0 + rng.uniform(-0.035, 0.035, 2000)
+
+    for feature, fence in zip(features, fences.fences):
+        expected = [scalar_inside(feature, lat, lon) for lat, lon in zip(lats, lons)]
+        np.testing.assert_array_equal(fences.contains(fence, lats, lons), expected)
+
+
+def test_indexed_events_match_brute_force(tmp_path):
+    features = random_fences()
+    fences = engine(tmp_path, features)
+    lats, lons = random_walk()
+
+    expected = []
+    for f, feature in enumerate(features):
+        inside = False
+        for i, (lat, lon) in enumerate(zip(lats, lons)):
+            now = scalar_inside(feature, lat, lon)
+            if now != inside:
+                expected.append((i * 1000, str(f), 'enter' if now else 'exit'))
+            inside = now
+
+    events = fences.evaluate(frame(lats, lons))
+    assert expected
+    assert sorted((e['epoch_ms'], e['fence'], e['event']) for e in events) == sorted(expected)
+
+
+def test_incremental_batches_equal_one_batch(tmp_path):
+    features = random_fences()
+    lats, lons = random_walk()
+    whole = engine(tmp_path, features).evaluate(frame(lats, lons))
+
+    batched = engine(tmp_path, features)
+    events = []
+    for start in range(0, len(lats), 7):
+        events += batched.evaluate(frame(lats[start:start + 7], lons[start:start + 7], start * 1000))
+
+    def key(event):
+        return event['epoch_ms'], event['fence'], event['event']
+    assert sorted(map(key, events)) == sorted(map(key, whole))
+
+
+def test_large_fences_bypass_the_grid(tmp_path):
+    # A 4 x 4 degree zone would otherwise sit in ~160,000 grid cells
+    big = polygon([square(LAT0, LON0, 2.0), square(LAT0, LON0, 0.02)], name='big')
+    features = random_fences(n=20) + [big]
+    fences = engine(tmp_path, features)
+    assert fences.large == [len(features) - 1]
+    assert len(fences.cells) <= 20 * geofence.MAX_CELLS_PER_FENCE
+
+    lats, lons = random_walk()
+    expected = []
+    inside = False
+    for i, (lat, lon) in enumerate(zip(lats, lons)):
+        now = scalar_inside(big, lat, lon)
+        if now != inside:
+            expected.append((i * 1000, 'enter' if now else 'exit'))
+        inside = now
+
+    events = fences.evaluate(frame(lats, lons))
+    assert expected
+    assert [(e['epoch_ms'], e['event']) for e in events if e['name'] == 'big'] == expected
+
+
+def test_holes_and_multipolygon(tmp_path):
+    holed = polygon([square(LAT0, LON0, 0.01), square(LAT0, LON0, 0.003)])
+    multi = {'type': 'Feature', 'properties': {'name': 'multi'},
+             'geometry': {'type': 'MultiPolygon', 'coordinates': [
+                 [square(LAT0, LON0 + 0.05, 0.005)],
+                 [square(LAT0, LON0 + 0.07, 0.005)]
+             ]}}
+    fences = engine(tmp_path, [holed, multi])
+
+    lats = np.full(3, LAT0)
+    # Ring, hole, outside
+    np.testing.assert_array_equal(fences.contains(fences.fences[0], lats, LON0 + np.array([0.006, 0.0, 0.02])),
+                                  [True, False, False])
+    # First part, gap between the parts, second part
+    np.testing.assert_array_equal(fences.contains(fences.fences[1], lats, LON0 + np.array([0.05, 0.06, 0.07])),
+                                  [True, False, True])
+
+
+def test_circle_edge(tmp_path):
+    fences = engine(tmp_path, [circle(LAT0, LON0, 100.0)])
+    meters_per_degree = haversine(LAT0, LON0, LAT0 + 1, LON0)
+    lats = LAT0 + np.array([99.9, 100.1, -99.9, -100.1]) / meters_per_degree
+    np.testing.assert_array_equal(fences.contains(fences.fences[0], lats, np.full(4, LON0)),
+                                  [True, False, True, False])
+
+
+def test_exit_from_occupied_fence_without_candidates(tmp_path):
+    fences = engine(tmp_path, [polygon([square(LAT0, LON0, 0.001)])])
+    entered = fences.evaluate(frame([LAT0], [LON0]))
+    assert [e['event'] for e in entered] == ['enter']
+    assert fences.active() == [0]
+
+    # Next batch is far away - no grid cell shared with the fence
+    exited = fences.evaluate(frame([LAT0 + 1.0, LAT0 + 1.001], [LON0, LON0], start_ms=1000))
+    assert [(e['event'], e['epoch_ms']) for e in exited] == [('exit', 1000)]
+    assert fences.active() == []
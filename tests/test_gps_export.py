@@ -0,0 +1,94 @@
+"""Tests for the streaming track export"""
+
+import csv
+import json
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+
+import pytest
+
+from gps_export import export_chunks, read_fixes, simplify
+
+FIELDS = ['timestamp', 'latitude', 'longitude', 'altitude', 'speed_knots', 'speed_kmh',
+          'course', 'satellites', 'hdop', 'fix_quality']
+
+START = datetime(2026, 1, 1)
+
+
+def write_log(path, seconds):
+    """One fix per listed second offset, heading north at ~36 km/h"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for i in seconds:
+            timestamp = (START + timedelta(seconds=i)).isoformat(timespec='microseconds')
+            writer.writerow([timestamp, 43.0 + i * 0.00009, -89.4, 270.0, 19.4, 36.0, 0.0, 10, 0.9, 1])
+
+
+def at(seconds):
+    return (START + timedelta(seconds=seconds)).isoformat()
+
+
+def test_time_range_filter(tmp_path):
+    log = tmp_path / 'gps_log_test.csv'
+    # The clock steps back once; fixes after the step are still filtered, not cut off
+    write_log(log, [0, 1, 2, 3, 4, 5, 2.5, 6])
+
+    fixes = list(read_fixes(str(log), start=at(2), end=at(4)))
+    assert [fix['epoch'] - fixes[0]['epoch'] for fix in fixes] == [0, 1, 2, 0.5]
+
+
+def test_partial_last_line_is_skipped(tmp_path):
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, range(5))
+    with open(log, 'a') as f:
+        f.write('2026-01-01T00:00:05.000000,43.00045,-89.4')
+
+    assert len(list(read_fixes(str(log)))) == 5
+
+
+def test_simplify_keeps_the_final_fix(tmp_path):
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, range(101))
+    fixes = list(read_fixes(str(log)))
+
+    # ~10 m apart, 35 m tolerance: every fourth fix, plus the last one
+    kept = list(simplify(fixes, 35.0))
+    assert kept[0] is fixes[0]
+    assert kept[-1] is fixes[-1]
+    assert len(kept) < len(fixes) / 3
+    assert list(simplify(fixes, 0.0)) == fixes
+
+
+@pytest.mark.parametrize('fmt', ['gpx', 'kml'])
+def test_xml_exports_are_well_formed(tmp_path, fmt):
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, range(3000))
+
+    root = ET.fromstring(''.join(export_chunks(str(log), fmt)))
+    if fmt == 'gpx':
+        points = root.findall('.//{http://www.topografix.com/GPX/1/1}trkpt')
+        assert len(points) == 3000
+        assert float(points[-1].get('lat')) == pytest.approx(43.0 + 2999 * 0.00009)
+    else:
+        coordinates = root.find('.//{http://www.opengis.net/kml/2.2}coordinates').text.split()
+        assert len(coordinates) == 3000
+
+
+def test_geojson_export_is_valid(tmp_path):
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, range(3000))
+
+    chunks = list(export_chunks(str(log), 'geojson'))
+    assert len(chunks) > 1
+    data = json.loads(''.join(chunks))
+    coordinates = data['features'][0]['geometry']['coordinates']
+    assert len(coordinates) == 3000
+    assert coordinates[0] == pytest.approx([-89.4, 43.0, 270.0])
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, range(3))
+    with pytest.raises(ValueError):
+        list(export_chunks(str(log), 'shp'))
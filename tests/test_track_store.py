@@ -0,0 +1,138 @@
+"""Tests for the incremental log store"""
+
+import csv
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import track_store
+from track_store import TrackStore
+
+FIELDS = ['timestamp', 'latitude', 'longitude', 'altitude', 'speed_knots', 'speed_kmh',
+          'course', 'satellites', 'hdop', 'fix_quality']
+
+START = datetime(2026, 1, 1)
+
+
+def write_log(path, n, start=0):
+    """Append n fixes, one per second, heading north at ~36 km/h"""
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if start == 0:
+            writer.writerow(FIELDS)
+        for i in range(start, start + n):
+            timestamp = (START + timedelta(seconds=i)).isoformat(timespec='microseconds')
+            writer.writerow([timestamp, 43.0 + i * 0.00009, -89.4, 270.0, 19.4, 36.0, 0.0, 10, 0.9, 1])
+
+
+def test_block_reads_match_single_read(tmp_path, monkeypatch):
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, 2000)
+
+    whole = TrackStore(history_dir=None)
+    whole.refresh(str(log))
+
+    # Tiny blocks force many block boundaries mid-file
+    monkeypatch.setattr(track_store, 'READ_BLOCK_BYTES', 1000)
+    blocks = TrackStore(history_dir=None)
+    assert blocks.refresh(str(log)) == 2000
+    assert blocks.offset == log.stat().st_size
+    for name in track_store.COLUMNS:
+        np.testing.assert_array_equal(blocks.column(name), whole.column(name))
+
+
+def test_partial_last_line_waits_for_completion(tmp_path):
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, 10)
+    with open(log, 'a') as f:
+        f.write('2026-01-01T00:00:10.000000,43.0009')
+
+    store = TrackStore(history_dir=None)
+    assert store.refresh(str(log)) == 10
+
+    with open(log, 'a') as f:
+        f.write(',-89.4,270.0,19.4,36.0,0.0,10,0.9,1\n')
+    assert store.refresh(str(log)) == 1
+    assert store.size == 11
+
+
+def test_window_is_binary_search_over_epoch(tmp_path):
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, 600)
+    store = TrackStore(history_dir=None)
+    store.refresh(str(log))
+
+    first = store.column('epoch_ms')[0]
+    assert store.window(first + 10000, first + 19000) == (10, 20)
+    assert store.last(60) == (539, 600)
+
+
+def test_memory_cap_spills_old_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(track_store, 'READ_BLOCK_BYTES', 4096)
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, 5000)
+
+    seen = []
+    store = TrackStore(on_append=lambda frame, start: seen.append((start, len(frame))),
+                       max_memory_mb=1000.5 * track_store.ROW_BYTES / 2**20,
+                       history_dir=str(tmp_path / 'history'))
+    assert store.max_rows == 1000
+    assert store.chunk_rows == 100
+    store.refresh(str(log))
+
+    assert store.size <= 1000
+    assert store.base + store.size == 5000
+    assert len(store.arrays['epoch_ms']) <= 4096
+    # Every fix reached the callback exactly once, in order
+    assert sum(n for _, n in seen) == 5000
+    assert [start for start, _ in seen] == list(np.cumsum([0] + [n for _, n in seen[:-1]]))
+
+
+def test_budget_below_minimum_is_rejected():
+    with pytest.raises(ValueError):
+        TrackStore(max_memory_mb=0.01)
+    with pytest.raises(ValueError):
+        TrackStore(retain_hours=0)
+
+    store = TrackStore(max_memory_mb=1)
+    assert store.budget_mb == pytest.approx(1, rel=0.01)
+    assert store.max_rows == 2**20 // track_store.ROW_BYTES
+
+
+def test_summaries_merge_minutes_across_spills(tmp_path, monkeypatch):
+    monkeypatch.setattr(track_store, 'READ_BLOCK_BYTES', 4096)
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, 5000)
+
+    store = TrackStore(max_memory_mb=1000.5 * track_store.ROW_BYTES / 2**20,
+                       history_dir=str(tmp_path / 'history'))
+    store.refresh(str(log))
+    spilled = store.spilled
+    path = store.history_path()
+    store.flush_summaries()
+
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    minutes = [int(row['start_epoch_ms']) // track_store.SUMMARY_BUCKET_MS for row in rows]
+    # One row per minute, even where a minute straddles two spill batches
+    assert minutes == sorted(set(minutes))
+    assert sum(int(row['points']) for row in rows) == spilled
+    # ~10 m per one-second step, including the steps across batch boundaries
+    step = track_store.EARTH_RADIUS * np.radians(0.00009)
+    assert sum(float(row['distance_m']) for row in rows) == pytest.approx((spilled - 1) * step, rel=1e-3)
+
+
+def test_rereading_a_log_rewrites_its_history(tmp_path):
+    log = tmp_path / 'gps_log_test.csv'
+    write_log(log, 3600)
+
+    counts = []
+    for _ in range(2):
+        # A restart: a new store re-reads the log from byte 0
+        store = TrackStore(retain_hours=0.25, history_dir=str(tmp_path / 'history'))
+        store.refresh(str(log))
+        store.flush_summaries()
+        with open(store.history_path(), newline='') as f:
+            counts.append(sum(int(row['points']) for row in csv.DictReader(f)))
+    assert counts[0] == counts[1] == store.spilled
@@ -0,0 +1,155 @@
+"""Tests for the online stop/move segmentation"""
+
+import pandas as pd
+import pytest
+
+from trip_segmentation import TripSegmenter
+
+METERS_PER_DEGREE_LAT = 111195
+
+
+def make_fixes(pattern, start_lat=43.0, lon=-89.4):
+    """(seconds, speed_kmh) runs -> one fix per second moving due north at that speed"""
+    fixes = []
+    t = 0
+    lat = start_lat
+    for seconds, speed in pattern:
+        for _ in range(seconds):
+            t += 1
+            lat += speed / 3.6 / METERS_PER_DEGREE_LAT
+            fixes.append((t, lat, lon, speed))
+    return fixes
+
+
+def segment(fixes, **kwargs):
+    segmenter = TripSegmenter(**kwargs)
+    for fix in fixes:
+        segmenter.add_fix(*fix)
+    return segmenter
+
+
+def kinds(segmenter):
+    return [s.kind for s in segmenter.all_segments()]
+
+
+def test_long_slow_run_is_promoted_to_stop():
+    segmenter = segment(make_fixes([(60, 40), (200, 0), (30, 40)]), min_stop_duration=120)
+    assert kinds(segmenter) == ['moving', 'stop', 'moving']
+
+    moving, stop, _ = segmenter.all_segments()
+    assert (stop.start_index, stop.end_index) == (60, 259)
+    assert stop.distance == 0
+    assert stop.max_speed == 0
+    # Segments tile the timeline: the stop starts at the last moving fix
+    assert stop.start_time == moving.end_time
+    assert segmenter.stop_ranges() == [(60, 259)]
+
+
+def test_pending_run_becomes_stop_exactly_at_dwell_threshold():
+    segmenter = segment(make_fixes([(10, 40), (120, 0)]), min_stop_duration=120)
+    assert segmenter.current.kind == 'stop'
+    assert segmenter.pending is None
+
+    segmenter = segment(make_fixes([(10, 40), (119, 0)]), min_stop_duration=120)
+    assert segmenter.current.kind == 'moving'
+    assert segmenter.pending is not None
+
+
+def test_short_slow_run_is_absorbed_into_moving_segment():
+    segmenter = segment(make_fixes([(60, 40), (30, 1), (60, 40)]), min_stop_duration=120)
+    assert kinds(segmenter) == ['moving']
+
+    trip = segmenter.trip_summary()
+    assert trip['stops'] == 0
+    assert trip['moving_time_s'] == pytest.approx(149)
+    only = segmenter.all_segments()[0]
+    assert (only.start_index, only.end_index, only.points) == (0, 149, 150)
+
+
+def test_slow_start_is_absorbed_when_movement_follows():
+    segmenter = segment(make_fixes([(20, 0), (60, 40)]), min_stop_duration=120)
+    assert kinds(segmenter) == ['moving']
+    assert segmenter.all_segments()[0].start_index == 0
+
+
+def test_all_segments_merges_pending_run_without_mutating_state():
+    segmenter = segment(make_fixes([(60, 40), (30, 0)]), min_stop_duration=120)
+    segments = segmenter.all_segments()
+    assert kinds(segmenter) == ['moving']
+    assert segments[0].end_index == 89
+    assert segments[0].points == 90
+
+    # The open segment itself still ends before the pending run
+    assert segmenter.current.end_index == 59
+    assert segmenter.pending.points == 30
+
+
+def test_pending_run_alone_reports_as_moving():
+    segmenter = segment(make_fixes([(30, 0)]), min_stop_duration=120)
+    assert kinds(segmenter) == ['moving']
+    assert segmenter.pending.kind == 'stop'
+
+
+def test_summary_statistics():
+    segmenter = segment(make_fixes([(61, 36)]))
+    summary = segmenter.all_segments()[0].as_dict()
+    # 36 km/h = 10 m/s; the first fix contributes no step
+    assert summary['distance_m'] == pytest.approx(600, rel=1e-3)
+    assert summary['duration_s'] == 60
+    assert summary['avg_speed_kmh'] == pytest.approx(36, rel=1e-3)
+    assert summary['max_speed_kmh'] == 36
+    (min_lat, min_lon), (max_lat, max_lon) = summary['bounds']
+    assert min_lat < max_lat
+    assert min_lon == max_lon == -89.4
+
+
+def test_trip_summary_excludes_parked_time_from_average():
+    segmenter = segment(make_fixes([(61, 36), (600, 0), (60, 36)]), min_stop_duration=120)
+    trip = segmenter.trip_summary()
+    assert trip['stops'] == 1
+    assert trip['trips'] == 2
+    assert trip['stopped_time_s'] == pytest.approx(600)
+    assert trip['moving_avg_speed_kmh'] == pytest.approx(36, rel=1e-2)
+
+
+@pytest.mark.parametrize('batch', [1, 7, 50, 1000])
+def test_incremental_extend_matches_one_shot(batch):
+    fixes = make_fixes([(5, 1), (60, 40), (30, 0), (60, 40), (200, 0), (10, 2), (40, 40), (150, 0)])
+    df = pd.DataFrame(fixes, columns=['timestamp', 'latitude', 'longitude', 'speed_kmh'])
+
+    one_shot = TripSegmenter()
+    one_shot.extend(df)
+
+    incremental = TripSegmenter()
+    for start in range(0, len(df), batch):
+        incremental.extend(df.iloc[start:start + batch])
+
+    assert [s.as_dict() for s in incremental.all_segments()] == [s.as_dict() for s in one_shot.all_segments()]
+    assert incremental.trip_summary() == one_shot.trip_summary()
+
+
+def test_extend_accepts_epoch_ms_and_iso_timestamps():
+    fixes = make_fixes([(60, 40), (200, 0)])
+    by_epoch = TripSegmenter()
+    by_epoch.extend(pd.DataFrame({
+        'epoch_ms': [t * 1000 for t, _, _, _ in fixes],
+        'latitude': [f[1] for f in fixes],
+        'longitude': [f[2] for f in fixes],
+        'speed_kmh': [f[3] for f in fixes]
+    }))
+    by_iso = TripSegmenter()
+    by_iso.extend(pd.DataFrame({
+        'timestamp': [pd.Timestamp(t, unit='s').isoformat() for t, _, _, _ in fixes],
+        'latitude': [f[1] for f in fixes],
+        'longitude': [f[2] for f in fixes],
+        'speed_kmh': [f[3] for f in fixes]
+    }))
+    assert by_epoch.trip_summary() == by_iso.trip_summary()
+
+
+def test_reset_forgets_everything():
+    segmenter = segment(make_fixes([(60, 40), (200, 0)]))
+    segmenter.reset()
+    assert segmenter.n_fixes == 0
+    assert segmenter.all_segments() == []
+    assert segmenter.trip_summary()['distance_m'] == 0
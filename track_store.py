@@ -0,0 +1,354 @@
+"""
+Track Store
+Incrementally tails a GPS log CSV into compact column arrays
+Timestamps are parsed once into an int64 epoch index for O(log n) windows
+Old rows are spilled to per-minute summaries on disk to bound memory
+"""
+
+import csv
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+# Columns kept in memory and their dtypes. Coordinates stay float64
+# (float32 would cost ~0.5 m); the rest fit comfortably in smaller types.
+COLUMNS = {
+    'epoch_ms': np.int64,
+    'latitude': np.float64,
+    'longitude': np.float64,
+    'altitude': np.float32,
+    'speed_kmh': np.float32,
+    'course': np.float32,
+    'satellites': np.int8,
+    'hdop': np.float32,
+    'fix_quality': np.int8
+}
+
+ROW_BYTES = sum(np.dtype(dtype).itemsize for dtype in COLUMNS.values())
+
+INITIAL_CAPACITY = 4096
+
+# A backlog is read in blocks of at most this many bytes (cut at the last
+# complete line), and each block is parsed in chunks of READ_CHUNK_ROWS,
+# so loading a large log never holds more than one block in memory
+READ_BLOCK_BYTES = 8 * 2**20
+READ_CHUNK_ROWS = 50000
+
+# Smallest memory budget accepted, in fixes
+MIN_RESIDENT_ROWS = 1000
+
+# Spill down to this fraction of the row limit, so trimming is not per-tick
+SPILL_TARGET = 0.9
+
+# Spilled history is summarized into buckets of this size
+SUMMARY_BUCKET_MS = 60 * 1000
+
+SUMMARY_FIELDS = [
+    'start_epoch_ms', 'end_epoch_ms', 'points', 'latitude', 'longitude',
+    'min_altitude', 'max_altitude', 'avg_speed_kmh', 'max_speed_kmh', 'distance_m'
+]
+
+EARTH_RADIUS = 6371000  # Earth's radius in meters
+
+UNIX_EPOCH = pd.Timestamp(0, tz='UTC')
+
+
+def parse_epoch_ms(timestamps):
+    """ISO timestamp strings -> int64 milliseconds since the Unix epoch (naive = UTC)"""
+    parsed = pd.to_datetime(timestamps, format='ISO8601', utc=True, errors='coerce')
+    valid = parsed.notna().to_numpy(copy=True)
+    epoch = np.zeros(len(parsed), dtype=np.int64)
+    epoch[valid] = (parsed[valid] - UNIX_EPOCH) // pd.Timedelta(milliseconds=1)
+    return epoch, valid
+
+
+def process_memory():
+    """Resident set size of this process in bytes (Linux), or None"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class TrackStore:
+    """Column arrays for one log file, grown as the logger appends rows
+
+    `on_append(frame, start)` is called with every batch of new fixes and
+    the absolute index of its first row, before anything can be spilled.
+    Row indices used by the other methods are relative to the resident
+    rows; `base` is the absolute index of resident row 0.
+    """
+
+    def __init__(self, on_append=None, max_memory_mb=None, retain_hours=None, history_dir='logs/history'):
+        self.on_append = on_append
+        self.history_dir = history_dir
+        self.csv_file = None
+        self._partial_bucket = None
+        self._last_spilled = None
+        self._history_open = False
+        self.set_retention(max_memory_mb, retain_hours)
+        self.reset()
+
+    def set_retention(self, max_memory_mb=None, retain_hours=None):
+        """Cap resident rows by memory budget and/or age (None = unlimited)
+
+        Raises ValueError for a budget too small to hold MIN_RESIDENT_ROWS
+        fixes or a non-positive age. Small budgets also shrink the parse
+        chunk, so one chunk never has to exceed the budget.
+        """
+        self.max_rows = None
+        self.chunk_rows = READ_CHUNK_ROWS
+        if max_memory_mb is not None:
+            max_rows = int(max_memory_mb * 2**20 // ROW_BYTES)
+            if not max_rows >= MIN_RESIDENT_ROWS:
+                raise ValueError(f"Memory budget of {max_memory_mb:g} MB holds fewer than "
+                                 f"{MIN_RESIDENT_ROWS} fixes (minimum "
+                                 f"{MIN_RESIDENT_ROWS * ROW_BYTES / 2**20:.2f} MB)")
+            self.max_rows = max_rows
+            # A chunk must fit in what spilling leaves free
+            self.chunk_rows = min(READ_CHUNK_ROWS, max_rows - int(max_rows * SPILL_TARGET))
+        if retain_hours is not None and not retain_hours > 0:
+            raise ValueError(f"Retention of {retain_hours:g} hours must be positive")
+        self.retain_ms = int(retain_hours * 3600 * 1000) if retain_hours is not None else None
+
+    @property
+    def budget_mb(self):
+        """Memory budget actually in effect for the column buffers, or None"""
+        return self.max_rows * ROW_BYTES / 2**20 if self.max_rows is not None else None
+
+    def reset(self, csv_file=None):
+        """Drop all rows and start tracking `csv_file` from its first byte"""
+        self.flush_summaries()
+        self._last_spilled = None
+        # The log is re-read from byte 0, so its history is rewritten, not appended to
+        self._history_open = False
+        self.csv_file = csv_file
+        self.offset = 0
+        self.header = None
+        self.size = 0
+        self.base = 0
+        self.spilled = 0
+        capacity = INITIAL_CAPACITY if self.max_rows is None else min(INITIAL_CAPACITY, self.max_rows)
+        self.arrays = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+    def refresh(self, csv_file):
+        """Read rows appended since the last call; returns the number of new fixes"""
+        if csv_file != self.csv_file or os.path.getsize(csv_file) < self.offset:
+            self.reset(csv_file)
+
+        added = 0
+        with open(csv_file, 'rb') as f:
+            while True:
+                f.seek(self.offset)
+                block = f.read(READ_BLOCK_BYTES)
+
+                # Only consume complete lines - the logger may be mid-write
+                end = block.rfind(b'\n')
+                if end < 0:
+                    if len(block) < READ_BLOCK_BYTES:
+                        break
+                    # A "line" longer than a whole block is not a fix - skip it
+                    self.offset += len(block)
+                    continue
+                block = block[:end + 1]
+                self.offset += len(block)
+                added += self._parse_block(block)
+
+        self._enforce_retention()
+        return added
+
+    def _parse_block(self, block):
+        """Parse complete CSV lines (the header too, on the first block)"""
+        if self.header is None:
+            header, _, block = block.partition(b'\n')
+            self.header = header.decode().strip().split(',')
+        if not block.strip():
+            return 0
+
+        added = 0
+        reader = pd.read_csv(io.BytesIO(block), names=self.header, header=None,
+                             on_bad_lines='skip', chunksize=self.chunk_rows)
+        for chunk in reader:
+            added += self._append(chunk)
+        return added
+
+    def _append(self, chunk):
+        numeric = {name: pd.to_numeric(chunk[name], errors='coerce').to_numpy()
+                   for name in COLUMNS if name != 'epoch_ms'}
+        epoch, valid = parse_epoch_ms(chunk['timestamp'])
+
+        # Same validity rules as before, plus rows that failed to parse
+        for values in numeric.values():
+            valid &= ~np.isnan(values)
+        valid &= (numeric['latitude'] != 0) & (numeric['longitude'] != 0) & (numeric['altitude'] != -999.0)
+
+        count = int(valid.sum())
+        if count == 0:
+            return 0
+
+        # Keep the index sorted even if the clock steps backwards
+        epoch = epoch[valid]
+        if self.size:
+            epoch = np.maximum(epoch, self.arrays['epoch_ms'][self.size - 1])
+        epoch = np.maximum.accumulate(epoch)
+
+        # Make room first so the buffers never outgrow the row limit
+        if self.max_rows is not None and self.size + count > self.max_rows:
+            self._spill(self.size + count - int(self.max_rows * SPILL_TARGET))
+
+        self._reserve(self.size + count)
+        start, stop = self.size, self.size + count
+        self.arrays['epoch_ms'][start:stop] = epoch
+        for name, values in numeric.items():
+            self.arrays[name][start:stop] = values[valid]
+        self.size = stop
+
+        if self.on_append is not None:
+            self.on_append(self.frame(start, stop), self.base + start)
+        return count
+
+    def _reserve(self, needed):
+        """Grow every column by doubling until `needed` rows fit (never past the row limit)"""
+        capacity = len(self.arrays['epoch_ms'])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        if self.max_rows is not None:
+            capacity = max(needed, min(capacity, self.max_rows))
+        for name, array in self.arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self.arrays[name] = grown
+
+    def _enforce_retention(self):
+        """Spill rows older than the retention age, once enough have expired to batch"""
+        if self.retain_ms is None or self.size == 0:
+            return
+        newest = self.arrays['epoch_ms'][self.size - 1]
+        slack = int(self.retain_ms * (1 - SPILL_TARGET))
+        if self.arrays['epoch_ms'][0] >= newest - self.retain_ms - slack:
+            return
+        self._spill(self.window(end_ms=newest - self.retain_ms - 1)[1])
+
+    def _spill(self, count):
+        """Summarize the oldest `count` rows to disk and drop them from memory"""
+        count = min(count, self.size)
+        if count <= 0:
+            return
+        self._write_summaries(self.frame(0, count))
+
+        for name, array in self.arrays.items():
+            array[:self.size - count] = array[count:self.size]
+        self.size -= count
+        self.base += count
+        self.spilled += count
+
+    def _write_summaries(self, df):
+        """Append per-minute summaries of `df` to the history file for this log
+
+        The newest bucket may continue in the next spill, so it is held
+        back (as running totals) and merged with that spill; the step from
+        the last spilled fix into the next batch is counted too. The held
+        bucket is written by flush_summaries().
+        """
+        if self.history_dir is None or self.csv_file is None:
+            return
+
+        lat = df['latitude'].to_numpy()
+        lon = df['longitude'].to_numpy()
+        if self._last_spilled is not None:
+            prev_lat = np.concatenate(([self._last_spilled[0]], lat))
+            prev_lon = np.concatenate(([self._last_spilled[1]], lon))
+        else:
+            prev_lat = np.concatenate((lat[:1], lat))
+            prev_lon = np.concatenate((lon[:1], lon))
+        lat_rad = np.radians(prev_lat)
+        a = (np.sin(np.diff(lat_rad) / 2)**2 +
+             np.cos(lat_rad[:-1]) * np.cos(lat_rad[1:]) * np.sin(np.radians(np.diff(prev_lon)) / 2)**2)
+        steps = EARTH_RADIUS * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        self._last_spilled = (lat[-1], lon[-1])
+
+        epoch = df['epoch_ms'].to_numpy()
+        _, starts, counts = np.unique(epoch // SUMMARY_BUCKET_MS, return_index=True, return_counts=True)
+        ends = starts + counts - 1
+        speed = df['speed_kmh'].to_numpy(dtype=np.float64)
+        alt = df['altitude'].to_numpy(dtype=np.float64)
+
+        # Running totals per bucket: sums rather than means, so buckets can merge
+        buckets = [list(row) for row in zip(
+            epoch[starts].tolist(), epoch[ends].tolist(), counts.tolist(),
+            np.add.reduceat(lat, starts).tolist(), np.add.reduceat(lon, starts).tolist(),
+            np.minimum.reduceat(alt, starts).tolist(), np.maximum.reduceat(alt, starts).tolist(),
+            np.add.reduceat(speed, starts).tolist(), np.maximum.reduceat(speed, starts).tolist(),
+            np.add.reduceat(steps, starts).tolist()
+        )]
+
+        held = self._partial_bucket
+        if held is not None:
+            if held[0] // SUMMARY_BUCKET_MS == buckets[0][0] // SUMMARY_BUCKET_MS:
+                first = buckets[0]
+                buckets[0] = [held[0], first[1], held[2] + first[2], held[3] + first[3], held[4] + first[4],
+                              min(held[5], first[5]), max(held[6], first[6]), held[7] + first[7],
+                              max(held[8], first[8]), held[9] + first[9]]
+            else:
+                buckets.insert(0, held)
+        self._partial_bucket = buckets.pop()
+        self._append_summary_rows(buckets)
+
+    def flush_summaries(self):
+        """Write the held-back newest bucket, if any (call at shutdown too)"""
+        if self._partial_bucket is not None:
+            self._append_summary_rows([self._partial_bucket])
+            self._partial_bucket = None
+
+    def _append_summary_rows(self, buckets):
+        if not buckets:
+            return
+        os.makedirs(self.history_dir, exist_ok=True)
+        # First write since reset() truncates what an earlier run left behind
+        with open(self.history_path(), 'a' if self._history_open else 'w', newline='') as f:
+            writer = csv.writer(f)
+            if not self._history_open:
+                writer.writerow(SUMMARY_FIELDS)
+                self._history_open = True
+            for start, end, points, lat_sum, lon_sum, min_alt, max_alt, speed_sum, max_speed, distance in buckets:
+                writer.writerow([int(start), int(end), int(points), f'{lat_sum / points:.7f}', f'{lon_sum / points:.7f}',
+                                 f'{min_alt:.1f}', f'{max_alt:.1f}', f'{speed_sum / points:.2f}', f'{max_speed:.2f}',
+                                 f'{distance:.1f}'])
+
+    def history_path(self):
+        """Where spilled summaries of the current log are written"""
+        name = os.path.splitext(os.path.basename(self.csv_file))[0]
+        return os.path.join(self.history_dir, f'{name}_summary.csv')
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column buffers"""
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def column(self, name, start=0, stop=None):
+        """View of one column between row indices (no copy)"""
+        stop = self.size if stop is None else stop
+        return self.arrays[name][start:stop]
+
+    def window(self, start_ms=None, end_ms=None):
+        """Row range [i0, i1) with start_ms <= epoch_ms <= end_ms, by binary search"""
+        epoch = self.column('epoch_ms')
+        i0 = 0 if start_ms is None else int(np.searchsorted(epoch, start_ms, side='left'))
+        i1 = self.size if end_ms is None else int(np.searchsorted(epoch, end_ms, side='right'))
+        return i0, max(i0, i1)
+
+    def last(self, seconds):
+        """Row range covering the final `seconds` of the log (relative to the newest fix)"""
+        if self.size == 0:
+            return 0, 0
+        newest = self.arrays['epoch_ms'][self.size - 1]
+        return self.window(start_ms=newest - int(seconds * 1000))
+
+    def frame(self, start=0, stop=None):
+        """DataFrame copy of a row range; cost is proportional to the range, not the log"""
+        return pd.DataFrame({name: self.column(name, start, stop) for name in COLUMNS}, copy=True)
@@ -0,0 +1,230 @@
+"""
+Trip Segmentation
+Splits the GPS fix stream into moving segments and stops
+Segment summaries are updated incrementally as fixes arrive
+"""
+
+import copy
+import math
+from datetime import datetime, timezone
+
+# Fixes slower than this are treated as stationary
+STOP_SPEED_KMH = 3.0
+
+# A slow run must last this long before it counts as a stop (seconds)
+MIN_STOP_DURATION = 120.0
+
+EARTH_RADIUS = 6371000  # Earth's radius in meters
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Distance between two points in meters (scalar Haversine)"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+
+    a = math.sin(delta_lat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon/2)**2
+    return EARTH_RADIUS * 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+
+def to_epoch(timestamp):
+    """Convert an ISO timestamp (or epoch number) to epoch seconds
+
+    Naive timestamps are taken as UTC, which is what the logger writes.
+    """
+    if isinstance(timestamp, (int, float)):
+        return float(timestamp)
+    parsed = datetime.fromisoformat(str(timestamp))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class SegmentSummary:
+    """Running summary of one moving segment or stop"""
+
+    def __init__(self, kind, index, epoch, lat, lon):
+        self.kind = kind
+        self.start_index = index
+        self.end_index = index
+        self.start_time = epoch
+        self.end_time = epoch
+        self.points = 0
+        self.distance = 0.0
+        self.speed_sum = 0.0
+        self.max_speed = 0.0
+        self.min_lat = self.max_lat = lat
+        self.min_lon = self.max_lon = lon
+
+    def add(self, index, epoch, lat, lon, speed_kmh, step_distance):
+        """Fold one fix (and the step leading to it) into the summary"""
+        self.end_index = index
+        self.end_time = epoch
+        self.points += 1
+        self.distance += step_distance
+        self.speed_sum += speed_kmh
+        self.max_speed = max(self.max_speed, speed_kmh)
+        self.min_lat = min(self.min_lat, lat)
+        self.max_lat = max(self.max_lat, lat)
+        self.min_lon = min(self.min_lon, lon)
+        self.max_lon = max(self.max_lon, lon)
+
+    def merge(self, other):
+        """Absorb a later, adjacent summary into this one"""
+        self.end_index = other.end_index
+        self.end_time = other.end_time
+        self.points += other.points
+        self.distance += other.distance
+        self.speed_sum += other.speed_sum
+        self.max_speed = max(self.max_speed, other.max_speed)
+        self.min_lat = min(self.min_lat, other.min_lat)
+        self.max_lat = max(self.max_lat, other.max_lat)
+        self.min_lon = min(self.min_lon, other.min_lon)
+        self.max_lon = max(self.max_lon, other.max_lon)
+
+    @property
+    def duration(self):
+        return self.end_time - self.start_time
+
+    @property
+    def avg_speed(self):
+        """Average speed in km/h, from distance over time when possible"""
+        if self.duration > 0:
+            return self.distance / self.duration * 3.6
+        return self.speed_sum / self.points if self.points else 0.0
+
+    @property
+    def bounds(self):
+        return [[self.min_lat, self.min_lon], [self.max_lat, self.max_lon]]
+
+    def as_dict(self):
+        return {
+            'kind': self.kind,
+            'start_index': self.start_index,
+            'end_index': self.end_index,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'points': self.points,
+            'distance_m': self.distance,
+            'duration_s': self.duration,
+            'avg_speed_kmh': self.avg_speed,
+            'max_speed_kmh': self.max_speed,
+            'bounds': self.bounds
+        }
+
+
+class TripSegmenter:
+    """Online stop/move segmentation driven by speed and dwell thresholds"""
+
+    def __init__(self, stop_speed_kmh=STOP_SPEED_KMH, min_stop_duration=MIN_STOP_DURATION):
+        self.stop_speed_kmh = stop_speed_kmh
+        self.min_stop_duration = min_stop_duration
+        self.reset()
+
+    def reset(self):
+        """Forget all fixes and segments"""
+        self.segments = []      # closed segments, oldest first
+        self.current = None     # open segment ('moving' or 'stop')
+        self.pending = None     # slow run not yet long enough to be a stop
+        self.n_fixes = 0
+        self._last = None       # (lat, lon, epoch) of the previous fix
+
+    def add_fix(self, timestamp, lat, lon, speed_kmh):
+        """Feed one fix; summaries are updated in O(1)"""
+        index = self.n_fixes
+        epoch = to_epoch(timestamp)
+        # New segments start at the previous fix so segments tile the timeline
+        start = epoch
+        step = 0.0
+        if self._last:
+            step = haversine(self._last[0], self._last[1], lat, lon)
+            start = self._last[2]
+        self._last = (lat, lon, epoch)
+        self.n_fixes += 1
+
+        if speed_kmh < self.stop_speed_kmh:
+            if self.current is not None and self.current.kind == 'stop':
+                self.current.add(index, epoch, lat, lon, speed_kmh, step)
+                return
+
+            if self.pending is None:
+                self.pending = SegmentSummary('stop', index, start, lat, lon)
+            self.pending.add(index, epoch, lat, lon, speed_kmh, step)
+
+            # Slow for long enough - the pending run becomes a stop
+            if self.pending.duration >= self.min_stop_duration:
+                self._close_current()
+                self.current = self.pending
+                self.pending = None
+            return
+
+        # Moving fix: a stop ends, a short slow run is absorbed into the trip
+        if self.current is not None and self.current.kind == 'stop':
+            self._close_current()
+        if self.current is None and self.pending is not None:
+            self.current = self.pending
+            self.current.kind = 'moving'
+        elif self.current is None:
+            self.current = SegmentSummary('moving', index, start, lat, lon)
+        elif self.pending is not None:
+            self.current.merge(self.pending)
+        self.pending = None
+        self.current.add(index, epoch, lat, lon, speed_kmh, step)
+
+    def extend(self, df):
+        """Feed every row of a DataFrame with the logger's CSV columns (or epoch_ms)"""
+        timestamps = df['epoch_ms'] / 1000 if 'epoch_ms' in df else df['timestamp']
+        for timestamp, lat, lon, speed in zip(timestamps, df['latitude'],
+                                              df['longitude'], df['speed_kmh']):
+            self.add_fix(timestamp, lat, lon, speed)
+
+    def _close_current(self):
+        if self.current is not None:
+            self.segments.append(self.current)
+            self.current = None
+
+    def all_segments(self):
+        """Closed segments plus the open one (a pending slow run counts as moving)"""
+        segments = list(self.segments)
+        if self.current is not None:
+            open_segment = self.current
+            if self.pending is not None:
+                open_segment = copy.copy(self.current)
+                open_segment.merge(self.pending)
+            segments.append(open_segment)
+        elif self.pending is not None:
+            open_segment = copy.copy(self.pending)
+            open_segment.kind = 'moving'
+            segments.append(open_segment)
+        return segments
+
+    def stop_ranges(self):
+        """(start_index, end_index) pairs of every stop, inclusive"""
+        return [(s.start_index, s.end_index) for s in self.all_segments() if s.kind == 'stop']
+
+    def trip_summary(self):
+        """Trip-level statistics aggregated from segment summaries only"""
+        segments = self.all_segments()
+        moving = [s for s in segments if s.kind == 'moving']
+        stops = [s for s in segments if s.kind == 'stop']
+
+        moving_distance = sum(s.distance for s in moving)
+        moving_time = sum(s.duration for s in moving)
+        summary = {
+            'distance_m': sum(s.distance for s in segments),
+            'moving_distance_m': moving_distance,
+            'moving_time_s': moving_time,
+            'stopped_time_s': sum(s.duration for s in stops),
+            'moving_avg_speed_kmh': moving_distance / moving_time * 3.6 if moving_time > 0 else 0.0,
+            'max_speed_kmh': max((s.max_speed for s in segments), default=0.0),
+            'trips': len(moving),
+            'stops': len(stops),
+            'bounds': None
+        }
+        if segments:
+            summary['bounds'] = [
+                [min(s.min_lat for s in segments), min(s.min_lon for s in segments)],
+                [max(s.max_lat for s in segments), max(s.max_lon for s in segments)]
+            ]
+        return summary